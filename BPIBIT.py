@@ -1,147 +1,126 @@
 # MicroPython ESP32 Module for BPI:bit/Web:bit
 # (Note! for firmware v1.17 only!)
 
-import math, utime, gc
-from machine import Pin, TouchPad, ADC, PWM, SoftI2C, SPI
+import math, utime, gc, ustruct, micropython
+from micropython import const
+from machine import Pin, TouchPad, ADC, PWM, SoftI2C, SPI, Timer, mem32
 from neopixel import NeoPixel
 
-# MPU9250 (MPU6500 + AK8963):
+# compass and gyro calibration saved on flash, loaded on import
+_CAL_FILE = 'bpibit.cal'
+_CAL_FORMAT = '<4s9f'
+_CAL_MAGIC = b'BPC1'
+
+def _calLoad():
+    try:
+        with open(_CAL_FILE, 'rb') as f:
+            data = ustruct.unpack(_CAL_FORMAT, f.read(ustruct.calcsize(_CAL_FORMAT)))
+        if data[0] == _CAL_MAGIC:
+            return data[1:4], data[4:7], data[7:10]
+    except:
+        pass
+    return (0, 0, 0), (1, 1, 1), (0, 0, 0)
+
+# MPU9250 (MPU6500 + AK8963), probed on first use:
 # https://github.com/tuupola/micropython-mpu9250
-try:
-    from mpu9250 import MPU9250
-    from ak8963 import AK8963
-    _mpu9250 = MPU9250(SoftI2C(scl=Pin(22), sda=Pin(21), freq=400000))
-except:
-    print('Onboard MPU9250 failed to import driver or initialize!')
-    _mpu9250 = None
+_mpu9250 = None
+_imuProbed = False
+_stats = None  # instrument.Instrument while enableStats() is on
+
+def _imu():
+    global _mpu9250, _imuProbed
+    if not _imuProbed:
+        _imuProbed = True
+        try:
+            from mpu9250 import MPU9250
+            from mpu6500 import MPU6500
+            from ak8963 import AK8963
+            i2c = SoftI2C(scl=Pin(22), sda=Pin(21), freq=400000)
+            if _stats:
+                i2c = _stats.i2c(i2c)
+            offset, scale, gyroOffset = _calLoad()
+            mpu6500 = MPU6500(i2c, gyro_offset=gyroOffset)  # enables bypass for the AK8963
+            _mpu9250 = MPU9250(i2c, mpu6500=mpu6500, ak8963=AK8963(i2c, offset=offset, scale=scale))
+        except:
+            print('Onboard MPU9250 failed to import driver or initialize!')
+            _mpu9250 = None
+    return _mpu9250
 
 gc.enable()
 
-# mapping dictionaries
+# mapping tables
 _analogPitchPin = 0
-_lightSensorL = ADC(Pin(36))
-_lightSensorL.atten(ADC.ATTN_11DB)
-_lightSensorR = ADC(Pin(39))
-_lightSensorR.atten(ADC.ATTN_11DB)
-_thermistor = ADC(Pin(34))
-_thermistor.atten(ADC.ATTN_11DB)
-_neoPixel = NeoPixel(Pin(4, Pin.OUT), 25)
-_analogPins = {1:32, 2:33}
-_digitalPins = {'BUILTIN_LED':18, 3:13, 0:25, 4:16, 5:35, 6:12, 7:14, 1:32, 8:16, 9:17, 10:26, 11:27, 12:2, 2:33, 13:18, 14:19, 15:23, 16:5, 19:22, 20:21}
-_touchpads = {3:13, 6:12, 7:14, 1:32, 11:27, 2:33}
-_ledScreen = {0:4, 1:9, 2:14, 3:19, 4:24, 5:3, 6:8, 7:13, 8:18, 9:23, 10:2, 11:7, 12:12, 13:17, 14:22, 15:1, 16:6, 17:11, 18:16, 19:21, 20:0, 21:5, 22:10, 23:15, 24:20}
-_colorCodes = {'W':(16, 16, 16), 'R':(48, 0, 0), 'G':(0, 48, 0), 'B':(0, 0, 48), 'Y':(24, 24, 0), 'C':(0, 24, 24), 'P':(24, 0, 24), 'O':(36, 12, 0), 'T':(0, 36, 12), 'V':(12, 0, 36), '*':(0, 0, 0)}
-_tones = {'C3':130.8128, 'C3D3':138.5913, 'D3':146.8324, 'D3E3':155.5635, 'E3':164.8138, 'F3':174.6141, 'F3G3':184.9972, 'G3':195.9977, 'G3A3':207.6523, 'A3':220.0000, 'A3B3':233.0819, 'B3':246.9417, 'C4':261.6256, 'C4D4':277.1826, 'D4':293.6648, 'D4E4':311.1270, 'E4':329.6276, 'F4':349.2282, 'F4G4':369.9944, 'G4':391.9954, 'G4A4':415.3047, 'A4':440.0000, 'A4B4':466.1638, 'B4':493.8833, 'C5':523.2511, 'C5D5':554.3653, 'D5':587.3295, 'D5E5':622.2540, 'E5':659.2551, 'F5':698.4565, 'F5G5':739.9888, 'G5':783.9909, 'G5A5':830.6094, 'A5':880.0000, 'A5B5':932.3275, 'B5':987.7666,  'C6':1046.502, 'C6D6':1108.731, 'D6':1174.659, 'D6E6':1244.508, 'E6':1318.510, 'F6':1396.913, 'F6G6':1479.978, 'G6':1567.982, 'G6A6':1661.219, 'A6':1760.000, 'A6B6':1864.655, 'B6':1975.533, 'C7':2093.005, '*': 0.0, ' ': 0.0}
-_axisName = {'x':0, 'y':1, 'z':2}
-_fonts = {'A':['*', 'X', 'X', '*', '*', 'X', '*', '*', 'X', '*', 'X', 'X', 'X', 'X', '*', 'X', '*', '*', 'X', '*', 'X', '*', '*', 'X', '*'],
-          'B':['X', 'X', 'X', '*', '*', 'X', '*', '*', 'X', '*', 'X', 'X', 'X', '*', '*', 'X', '*', '*', 'X', '*', 'X', 'X', 'X', '*', '*'],
-          'C':['*', 'X', 'X', 'X', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', '*', 'X', 'X', 'X', '*'],
-          'D':['X', 'X', 'X', '*', '*', 'X', '*', '*', 'X', '*', 'X', '*', '*', 'X', '*', 'X', '*', '*', 'X', '*', 'X', 'X', 'X', '*', '*'],
-          'E':['X', 'X', 'X', 'X', '*', 'X', '*', '*', '*', '*', 'X', 'X', 'X', '*', '*', 'X', '*', '*', '*', '*', 'X', 'X', 'X', 'X', '*'],
-          'F':['X', 'X', 'X', 'X', '*', 'X', '*', '*', '*', '*', 'X', 'X', 'X', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*'],
-          'G':['*', 'X', 'X', 'X', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', 'X', 'X', 'X', '*', '*', '*', 'X', '*', 'X', 'X', 'X', '*'],
-          'H':['X', '*', '*', 'X', '*', 'X', '*', '*', 'X', '*', 'X', 'X', 'X', 'X', '*', 'X', '*', '*', 'X', '*', 'X', '*', '*', 'X', '*'],
-          'I':['X', 'X', 'X', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', 'X', 'X', 'X', '*', '*'],
-          'J':['X', 'X', 'X', 'X', 'X', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', 'X', '*', '*', 'X', '*', '*', 'X', 'X', '*', '*'],
-          'K':['X', '*', '*', 'X', '*', 'X', '*', 'X', '*', '*', 'X', 'X', '*', '*', '*', 'X', '*', 'X', '*', '*', 'X', '*', '*', 'X', '*'],
-          'L':['X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', 'X', 'X', 'X', '*'],
-          'M':['X', '*', '*', '*', 'X', 'X', 'X', '*', 'X', 'X', 'X', '*', 'X', '*', 'X', 'X', '*', '*', '*', 'X', 'X', '*', '*', '*', 'X'],
-          'N':['X', '*', '*', '*', 'X', 'X', 'X', '*', '*', 'X', 'X', '*', 'X', '*', 'X', 'X', '*', '*', 'X', 'X', 'X', '*', '*', '*', 'X'],
-          'O':['*', 'X', 'X', '*', '*', 'X', '*', '*', 'X', '*', 'X', '*', '*', 'X', '*', 'X', '*', '*', 'X', '*', '*', 'X', 'X', '*', '*'],
-          'P':['X', 'X', 'X', '*', '*', 'X', '*', '*', 'X', '*', 'X', '*', '*', 'X', '*', 'X', 'X', 'X', '*', '*', 'X', '*', '*', '*', '*'],
-          'Q':['*', 'X', 'X', '*', '*', 'X', '*', '*', 'X', '*', 'X', '*', '*', 'X', '*', '*', 'X', 'X', '*', '*', '*', '*', 'X', 'X', '*'],
-          'R':['X', 'X', 'X', '*', '*', 'X', '*', '*', 'X', '*', 'X', 'X', 'X', '*', '*', 'X', '*', '*', 'X', '*', 'X', '*', '*', '*', 'X'],
-          'S':['*', 'X', 'X', 'X', '*', 'X', '*', '*', '*', '*', '*', 'X', 'X', '*', '*', '*', '*', '*', 'X', '*', 'X', 'X', 'X', '*', '*'],
-          'T':['X', 'X', 'X', 'X', 'X', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*'],
-          'U':['X', '*', '*', 'X', '*', 'X', '*', '*', 'X', '*', 'X', '*', '*', 'X', '*', 'X', '*', '*', 'X', '*', '*', 'X', 'X', '*', '*'],
-          'V':['X', '*', '*', '*', 'X', 'X', '*', '*', '*', 'X', 'X', '*', '*', '*', 'X', '*', 'X', '*', 'X', '*', '*', '*', 'X', '*', '*'],
-          'W':['X', '*', '*', '*', 'X', 'X', '*', '*', '*', 'X', 'X', '*', 'X', '*', 'X', 'X', 'X', '*', 'X', 'X', 'X', '*', '*', '*', 'X'],
-          'X':['X', '*', '*', 'X', '*', 'X', '*', '*', 'X', '*', '*', 'X', 'X', '*', '*', 'X', '*', '*', 'X', '*', 'X', '*', '*', 'X', '*'],
-          'Y':['X', '*', '*', '*', 'X', '*', 'X', '*', 'X', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*'],
-          'Z':['X', 'X', 'X', 'X', '*', '*', '*', 'X', '*', '*', '*', 'X', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', 'X', 'X', 'X', '*'],
-          'a':['*', '*', '*', '*', '*', '*', 'X', 'X', 'X', '*', 'X', '*', '*', 'X', '*', 'X', '*', '*', 'X', '*', '*', 'X', 'X', 'X', 'X'],
-          'b':['X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', 'X', 'X', '*', '*', 'X', '*', '*', 'X', '*', 'X', 'X', 'X', '*', '*'],
-          'c':['*', '*', '*', '*', '*', '*', 'X', 'X', 'X', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', '*', 'X', 'X', 'X', '*'],
-          'd':['*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', 'X', 'X', 'X', '*', 'X', '*', '*', 'X', '*', '*', 'X', 'X', 'X', '*'],
-          'e':['*', 'X', 'X', '*', '*', 'X', '*', '*', 'X', '*', 'X', 'X', 'X', '*', '*', 'X', '*', '*', '*', '*', '*', 'X', 'X', 'X', '*'],
-          'f':['*', '*', 'X', 'X', '*', '*', 'X', '*', '*', '*', 'X', 'X', 'X', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*'],
-          'g':['*', 'X', 'X', 'X', '*', 'X', '*', '*', 'X', '*', '*', 'X', 'X', 'X', '*', '*', '*', '*', 'X', '*', '*', 'X', 'X', 'X', '*'],
-          'h':['X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', 'X', 'X', '*', '*', 'X', '*', '*', 'X', '*', 'X', '*', '*', 'X', '*'],
-          'i':['X', '*', '*', '*', '*', '*', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*'],
-          'j':['*', '*', 'X', '*', '*', '*', '*', '*', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', 'X', 'X', '*', '*', '*'],
-          'k':['X', '*', '*', '*', '*', 'X', '*', 'X', '*', '*', 'X', 'X', '*', '*', '*', 'X', '*', 'X', '*', '*', 'X', '*', '*', 'X', '*'],
-          'l':['X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', '*', 'X', 'X', '*', '*'],
-          'm':['*', '*', '*', '*', '*', 'X', 'X', '*', 'X', 'X', 'X', '*', 'X', '*', 'X', 'X', '*', '*', '*', 'X', 'X', '*', '*', '*', 'X'],
-          'n':['*', '*', '*', '*', '*', 'X', 'X', 'X', '*', '*', 'X', '*', '*', 'X', '*', 'X', '*', '*', 'X', '*', 'X', '*', '*', 'X', '*'],
-          'o':['*', '*', '*', '*', '*', '*', 'X', 'X', '*', '*', 'X', '*', '*', 'X', '*', 'X', '*', '*', 'X', '*', '*', 'X', 'X', '*', '*'],
-          'p':['*', '*', '*', '*', '*', 'X', 'X', 'X', '*', '*', 'X', '*', '*', 'X', '*', 'X', 'X', 'X', '*', '*', 'X', '*', '*', '*', '*'],
-          'q':['*', '*', '*', '*', '*', '*', 'X', 'X', 'X', '*', 'X', '*', '*', 'X', '*', '*', 'X', 'X', 'X', '*', '*', '*', '*', 'X', '*'],
-          'r':['*', '*', '*', '*', '*', '*', 'X', 'X', 'X', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*'],
-          's':['*', '*', '*', '*', '*', '*', '*', 'X', 'X', '*', '*', 'X', '*', '*', '*', '*', '*', 'X', '*', '*', 'X', 'X', '*', '*', '*'],
-          't':['*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', 'X', 'X', '*', '*', 'X', '*', '*', '*', '*', '*', 'X', 'X', 'X'],
-          'u':['*', '*', '*', '*', '*', 'X', '*', '*', 'X', '*', 'X', '*', '*', 'X', '*', 'X', '*', '*', 'X', '*', '*', 'X', 'X', 'X', 'X'],
-          'v':['*', '*', '*', '*', '*', 'X', '*', '*', '*', 'X', 'X', '*', '*', '*', 'X', '*', 'X', '*', 'X', '*', '*', '*', 'X', '*', '*'],
-          'w':['*', '*', '*', '*', '*', 'X', '*', '*', '*', 'X', 'X', '*', '*', '*', 'X', 'X', '*', 'X', '*', 'X', 'X', 'X', '*', 'X', 'X'],
-          'x':['*', '*', '*', '*', '*', 'X', '*', '*', 'X', '*', '*', 'X', 'X', '*', '*', '*', 'X', 'X', '*', '*', 'X', '*', '*', 'X', '*'],
-          'y':['*', '*', '*', '*', '*', 'X', '*', '*', '*', 'X', '*', 'X', '*', 'X', '*', '*', '*', 'X', '*', '*', 'X', 'X', '*', '*', '*'],
-          'z':['*', '*', '*', '*', '*', 'X', 'X', 'X', 'X', '*', '*', '*', 'X', '*', '*', '*', 'X', '*', '*', '*', 'X', 'X', 'X', 'X', '*'],
-          '0':['*', 'X', 'X', '*', '*', 'X', '*', '*', 'X', '*', 'X', '*', '*', 'X', '*', 'X', '*', '*', 'X', '*', '*', 'X', 'X', '*', '*'],
-          '1':['*', '*', 'X', '*', '*', '*', 'X', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', 'X', 'X', 'X', '*'],
-          '2':['X', 'X', 'X', '*', '*', '*', '*', '*', 'X', '*', '*', 'X', 'X', '*', '*', 'X', '*', '*', '*', '*', 'X', 'X', 'X', 'X', '*'],
-          '3':['X', 'X', 'X', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', 'X', '*', '*', 'X', '*', '*', 'X', '*', '*', 'X', 'X', '*', '*'],
-          '4':['*', '*', '*', 'X', '*', '*', '*', 'X', 'X', '*', '*', 'X', '*', 'X', '*', 'X', 'X', 'X', 'X', 'X', '*', '*', '*', 'X', '*'],
-          '5':['X', 'X', 'X', 'X', 'X', 'X', '*', '*', '*', '*', 'X', 'X', 'X', 'X', '*', '*', '*', '*', '*', 'X', 'X', 'X', 'X', 'X', '*'],
-          '6':['*', '*', '*', 'X', '*', '*', '*', 'X', '*', '*', '*', 'X', 'X', 'X', '*', 'X', '*', '*', '*', 'X', '*', 'X', 'X', 'X', '*'],
-          '7':['X', 'X', 'X', 'X', 'X', '*', '*', '*', 'X', '*', '*', '*', 'X', '*', '*', '*', 'X', '*', '*', '*', 'X', '*', '*', '*', '*'],
-          '8':['*', 'X', 'X', 'X', '*', 'X', '*', '*', '*', 'X', '*', 'X', 'X', 'X', '*', 'X', '*', '*', '*', 'X', '*', 'X', 'X', 'X', '*'],
-          '9':['*', 'X', 'X', 'X', '*', 'X', '*', '*', '*', 'X', '*', 'X', 'X', 'X', '*', '*', '*', 'X', '*', '*', '*', 'X', '*', '*', '*'],
-          ',':['*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', 'X', '*', '*', '*', 'X', '*', '*', '*', '*'],
-          '.':['*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', 'X', '*', '*', '*', '*', '*', '*', '*', '*', '*'],
-          '!':['X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', '*', '*', '*', '*', '*', 'X', '*', '*', '*', '*'],
-          ':':['*', '*', '*', '*', '*', 'X', '*', '*', '*', '*', '*', '*', '*', '*', '*', 'X', '*', '*', '*', '*', '*', '*', '*', '*', '*'],
-          ';':['*', '*', '*', '*', '*', '*', 'X', '*', '*', '*', '*', '*', '*', '*', '*', '*', 'X', '*', '*', '*', 'X', '*', '*', '*', '*'],
-          '+':['*', '*', '*', '*', '*', '*', 'X', '*', '*', '*', 'X', 'X', 'X', '*', '*', '*', 'X', '*', '*', '*', '*', '*', '*', '*', '*'],
-          '-':['*', '*', '*', '*', '*', '*', '*', '*', '*', '*', 'X', 'X', 'X', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*'],
-          '*':['*', '*', '*', '*', '*', 'X', '*', 'X', '*', '*', 'X', 'X', '*', '*', '*', 'X', '*', 'X', '*', '*', '*', '*', '*', '*', '*'],
-          '/':['*', '*', '*', '*', 'X', '*', '*', '*', 'X', '*', '*', '*', 'X', '*', '*', '*', 'X', '*', '*', '*', 'X', '*', '*', '*', '*'],
-          '=':['*', '*', '*', '*', '*', 'X', 'X', 'X', '*', '*', '*', '*', '*', '*', '*', 'X', 'X', 'X', '*', '*', '*', '*', '*', '*', '*'],
-          '_':['*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', 'X', 'X', 'X', 'X', 'X'],
-          '|':['*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*'],
-          '\\':['X', '*', '*', '*', '*', '*', 'X', '*', '*', '*', '*', '*', 'X', '*', '*', '*', '*', '*', 'X', '*', '*', '*', '*', '*', 'X'],
-          '`':['X', '*', '*', '*', '*', '*', 'X', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*'],
-          '~':['*', '*', '*', '*', '*', '*', '*', '*', '*', '*', 'X', 'X', '*', '*', '*', '*', '*', 'X', 'X', '*', '*', '*', '*', '*', '*'],
-          '@':['*', 'X', 'X', 'X', '*', 'X', '*', '*', '*', 'X', 'X', '*', 'X', '*', 'X', 'X', '*', '*', 'X', 'X', '*', 'X', 'X', '*', '*'],
-          '#':['*', 'X', '*', 'X', '*', 'X', 'X', 'X', 'X', 'X', '*', 'X', '*', 'X', '*', 'X', 'X', 'X', 'X', 'X', '*', 'X', '*', 'X', '*'],
-          '$':['*', 'X', 'X', 'X', '*', 'X', 'X', '*', '*', 'X', '*', 'X', 'X', 'X', '*', '*', '*', '*', 'X', 'X', '*', 'X', 'X', 'X', '*'],
-          '%':['X', 'X', '*', '*', 'X', 'X', '*', '*', 'X', '*', '*', '*', 'X', '*', '*', '*', 'X', '*', '*', 'X', 'X', '*', '*', 'X', 'X'],
-          '^':['*', 'X', '*', '*', '*', 'X', '*', 'X', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*'],
-          '&':['*', 'X', 'X', '*', '*', 'X', '*', '*', 'X', '*', '*', 'X', 'X', '*', '*', 'X', '*', '*', 'X', '*', '*', 'X', 'X', '*', 'X'],
-          '\'':['X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*'],
-          '\'':['X', '*', 'X', '*', '*', 'X', '*', 'X', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*'],
-          '(':['*', 'X', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', '*', 'X', '*', '*', '*'],
-          ')':['X', '*', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', 'X', '*', '*', '*', '*'],
-          '[':['X', 'X', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', 'X', '*', '*', '*'],
-          ']':['X', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', 'X', 'X', '*', '*', '*'],
-          '{':['*', 'X', 'X', '*', '*', '*', 'X', '*', '*', '*', 'X', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', 'X', '*', '*'],
-          '}':['X', 'X', '*', '*', '*', '*', 'X', '*', '*', '*', '*', 'X', 'X', '*', '*', '*', 'X', '*', '*', '*', 'X', 'X', '*', '*', '*'],
-          '<':['*', '*', 'X', '*', '*', '*', 'X', '*', '*', '*', 'X', '*', '*', '*', '*', '*', 'X', '*', '*', '*', '*', '*', 'X', '*', '*'],
-          '>':['X', '*', '*', '*', '*', '*', 'X', '*', '*', '*', '*', '*', 'X', '*', '*', '*', 'X', '*', '*', '*', 'X', '*', '*', '*', '*'],
-          ' ':['*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*', '*']}
-_fontsWidth = {'A':4, 'B':4, 'C':4, 'D':4, 'E':4, 'F':4, 'G':5, 'H':4, 'I':3, 'J':5, 'K':4, 'L':4, 'M':5, 'N':5, 'O':4, 'P':4, 'Q':4, 'R':5, 'S':4, 'T':5, 'U':4, 'V':5, 'W':5, 'X':4, 'Y':5, 'Z':4, 'a':5, 'b':4, 'c':4, 'd':4, 'e':4, 'f':4, 'g':5, 'h':4, 'i':1, 'j':3, 'k':4, 'l':3, 'm':5, 'n':4, 'o':4, 'p':4, 'q':4, 'r':4, 's':4, 't':5, 'u':5, 'v':5, 'w':5, 'x':4, 'y':5, 'z':4, '0':4, '1':4, '2':4, '3':4, '4':5, '5':5, '6':5, '7':5, '8':5, '9':5, ',':1, '.':2, '!':1, ':':1, ';':2, '+':3, '-':3, '*':3, '/':5, '_':5, '=':3, '|':3, '\\':5, '`':2, '~':4, '@':5, '#':5, '$':5, '%':5, '^':3, '&':5, '\'':1, '\'':3, '(':2, ')':2, '[':2, ']':2, '{':3, '}':3, '<':3, '>':3, ' ':3}
+_LIGHT_L = const(36)
+_LIGHT_R = const(39)
+_THERMISTOR = const(34)
+_sensors = {}
+_neoPixel = None
+_ledFront = None
+_ledBack = bytearray(75)
+_ledShown = bytearray(75)  # _ledBack as last written, before the LUT
+_ledAuto = True
+_ledLUT = None  # brightness/gamma table, None when both are neutral or not built yet
+_ledDirty = False  # the table changed since the last write
+_ledBrightness = 255
+_ledCodeLevel = 48  # color codes are dimmed to protect the NeoPixels
+_ledGamma = 1.0
+# micro:bit pin n -> GPIO at index n, 0xff where the pin has no such function
+_analogPins = b'\xff\x20\x21'
+_digitalPins = b'\x19\x20\x21\x0d\x10\x23\x0c\x0e\x10\x11\x1a\x1b\x02\x12\x13\x17\x05\xff\xff\x16\x15'
+_touchpads = b'\xff\x20\x21\x0d\xff\xff\x0c\x0e\xff\xff\xff\x1b'
+_ledScreen = b'\x04\x09\x0e\x13\x18\x03\x08\x0d\x12\x17\x02\x07\x0c\x11\x16\x01\x06\x0b\x10\x15\x00\x05\x0a\x0f\x14'  # led index -> NeoPixel index
+_colorPalette = {'W':0x555555, 'R':0xff0000, 'G':0x00ff00, 'B':0x0000ff, 'Y':0x808000, 'C':0x008080, 'P':0x800080, 'O':0xbf4000, 'T':0x00bf40, 'V':0x4000bf, '*':0x000000}  # packed 0xRRGGBB, full scale; dicts as ledPalette() adds codes
+_colorCodes = {'W':0x101010, 'R':0x300000, 'G':0x003000, 'B':0x000030, 'Y':0x181800, 'C':0x001818, 'P':0x180018, 'O':0x240c00, 'T':0x00240c, 'V':0x0c0024, '*':0x000000}  # _colorPalette at _ledCodeLevel
+_axisName = ('x', 'y', 'z')
+_imuAccel = (0.0, 0.0, 0.0)
+_imuGyro = (0.0, 0.0, 0.0)
+_imuMag = (0.0, 0.0, 0.0)
+_imuHandlers = []
+# 5x5 font: 5 column bitmasks per glyph (bit 0 = top row) and the scroll width
+_fontChars = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789,.!:;+-*/=_|\\`~@#$%^&'()[]{}<> "
+_fontData = (
+    b'\x1e\x05\x05\x1e\x00\x1f\x15\x15\x0a\x00\x0e\x11\x11\x11\x00\x1f\x11\x11\x0e\x00\x1f\x15\x15\x11\x00\x1f\x05\x05\x01\x00\x0e\x11\x11\x15\x0c\x1f\x04\x04\x1f\x00' # ABCDEFGH
+    b'\x11\x1f\x11\x00\x00\x09\x11\x11\x0f\x01\x1f\x04\x0a\x11\x00\x1f\x10\x10\x10\x00\x1f\x02\x04\x02\x1f\x1f\x02\x04\x08\x1f\x0e\x11\x11\x0e\x00\x1f\x09\x09\x06\x00' # IJKLMNOP
+    b'\x06\x09\x19\x16\x00\x1f\x05\x05\x0a\x10\x12\x15\x15\x09\x00\x01\x01\x1f\x01\x01\x0f\x10\x10\x0f\x00\x07\x08\x10\x08\x07\x1f\x08\x04\x08\x1f\x1b\x04\x04\x1b\x00' # QRSTUVWX
+    b'\x01\x02\x1c\x02\x01\x19\x15\x13\x11\x00\x0c\x12\x12\x1e\x10\x1f\x14\x14\x08\x00\x0c\x12\x12\x12\x00\x08\x14\x14\x1f\x00\x0e\x15\x15\x12\x00\x04\x1e\x05\x01\x00' # YZabcdef
+    b'\x02\x15\x15\x1f\x00\x1f\x04\x04\x18\x00\x1d\x00\x00\x00\x00\x10\x10\x0d\x00\x00\x1f\x04\x0a\x10\x00\x0f\x10\x10\x00\x00\x1e\x02\x04\x02\x1e\x1e\x02\x02\x1c\x00' # ghijklmn
+    b'\x0c\x12\x12\x0c\x00\x1e\x0a\x0a\x04\x00\x04\x0a\x0a\x1e\x00\x1c\x02\x02\x02\x00\x10\x14\x0a\x02\x00\x00\x0f\x14\x14\x10\x0e\x10\x10\x1e\x10\x06\x08\x10\x08\x06' # opqrstuv
+    b'\x1e\x10\x08\x10\x1e\x12\x0c\x0c\x12\x00\x12\x14\x08\x04\x02\x12\x1a\x16\x12\x00\x0e\x11\x11\x0e\x00\x00\x12\x1f\x10\x00\x19\x15\x15\x12\x00\x09\x11\x15\x0b\x00' # wxyz0123
+    b'\x08\x0c\x0a\x1f\x08\x17\x15\x15\x15\x09\x08\x14\x16\x15\x08\x11\x09\x05\x03\x01\x0a\x15\x15\x15\x0a\x02\x15\x0d\x05\x02\x10\x08\x00\x00\x00\x08\x00\x00\x00\x00' # 456789,.
+    b'\x17\x00\x00\x00\x00\x0a\x00\x00\x00\x00\x10\x0a\x00\x00\x00\x04\x0e\x04\x00\x00\x04\x04\x04\x00\x00\x0e\x04\x0a\x00\x00\x10\x08\x04\x02\x01\x0a\x0a\x0a\x00\x00' # !:;+-*/=
+    b'\x10\x10\x10\x10\x10\x00\x1f\x00\x00\x00\x01\x02\x04\x08\x10\x01\x02\x00\x00\x00\x04\x04\x08\x08\x00\x0e\x11\x15\x09\x0e\x0a\x1f\x0a\x1f\x0a\x02\x17\x15\x1d\x0a' # _|\\`~@#$
+    b'\x13\x09\x04\x12\x19\x02\x01\x02\x00\x00\x0a\x15\x15\x0a\x10\x03\x00\x03\x00\x00\x0e\x11\x00\x00\x00\x11\x0e\x00\x00\x00\x1f\x11\x00\x00\x00\x11\x1f\x00\x00\x00' # %^&'()[]
+    b'\x04\x1f\x11\x00\x00\x11\x1f\x04\x00\x00\x04\x0a\x11\x00\x00\x11\x0a\x04\x00\x00\x00\x00\x00\x00\x00' # {}<> 
+)
+_fontWidths = b'\x04\x04\x04\x04\x04\x04\x05\x04\x03\x05\x04\x04\x05\x05\x04\x04\x04\x05\x04\x05\x04\x05\x05\x04\x05\x04\x05\x04\x04\x04\x04\x04\x05\x04\x01\x03\x04\x03\x05\x04\x04\x04\x04\x04\x04\x05\x05\x05\x05\x04\x05\x04\x04\x04\x04\x04\x05\x05\x05\x05\x05\x05\x01\x02\x01\x01\x02\x03\x03\x03\x05\x03\x05\x03\x05\x02\x04\x05\x05\x05\x05\x03\x05\x03\x02\x02\x02\x02\x03\x03\x03\x03\x03'
+_fontSpace = len(_fontChars) - 1
 
 gc.collect()
 
+def _hasGPIO(table, pin):
+    return type(pin) is int and 0 <= pin < len(table) and table[pin] != 0xff
+
+def _gpio(table, pin):
+    if pin == 'BUILTIN_LED':
+        pin = 13  # GPIO 18
+    if not _hasGPIO(table, pin):
+        raise ValueError('no pin %r' % (pin,))
+    return table[pin]
+
 def getI2C(scl=19, sda=20, freq=400000):
-    return SoftI2C(scl=Pin(_digitalPins[scl]), sda=Pin(_digitalPins[sda]), freq=freq)
+    return SoftI2C(scl=Pin(_gpio(_digitalPins, scl)), sda=Pin(_gpio(_digitalPins, sda)), freq=freq)
+
+def getIMU():
+    return _imu()
 
 def getSPI(sck=13, miso=14, mosi=15, baudrate=1000000, polarity=1, phase=0):
-    return SPI(baudrate=baudrate, polarity=polarity, phase=phase, sck=Pin(_digitalPins[sck]), mosi=Pin(_digitalPins[mosi]), miso=Pin(_digitalPins[miso]))
+    return SPI(baudrate=baudrate, polarity=polarity, phase=phase, sck=Pin(_gpio(_digitalPins, sck)), mosi=Pin(_gpio(_digitalPins, mosi)), miso=Pin(_gpio(_digitalPins, miso)))
 
 def getHSPI(baudrate=10000000, polarity=1, phase=0):
-    return SPI(1, baudrate=baudrate, polarity=polarity, phase=phase, sck=Pin(_digitalPins[7]), mosi=Pin(_digitalPins[3]), miso=Pin(_digitalPins[6]))
+    return SPI(1, baudrate=baudrate, polarity=polarity, phase=phase, sck=Pin(_gpio(_digitalPins, 7)), mosi=Pin(_gpio(_digitalPins, 3)), miso=Pin(_gpio(_digitalPins, 6)))
 
 def getVSPI(baudrate=10000000, polarity=1, phase=0):
-    return SPI(2, baudrate=baudrate, polarity=polarity, phase=phase, sck=Pin(_digitalPins[13]), mosi=Pin(_digitalPins[15]), miso=Pin(_digitalPins[14]))
+    return SPI(2, baudrate=baudrate, polarity=polarity, phase=phase, sck=Pin(_gpio(_digitalPins, 13)), mosi=Pin(_gpio(_digitalPins, 15)), miso=Pin(_gpio(_digitalPins, 14)))
 
 def pause(delay):
     utime.sleep_ms(delay)
@@ -155,197 +134,1568 @@ def runningTime():
 def runningTimeMicros():
     return utime.ticks_us()
 
+# background tasks share one hardware timer, re-armed as a one-shot
+# for the next due task so nothing runs while there is nothing to do
+_TIMER_ID = 3
+_timer = None
+_timerTasks = []
+_timerError = None
+
+def _timerAdd(callback, period):
+    task = [callback, max(1, round(period)), utime.ticks_add(utime.ticks_ms(), round(period))]
+    _timerTasks.append(task)
+    _timerArm()
+    return task
+
+def _timerRemove(task):
+    if task in _timerTasks:
+        _timerTasks.remove(task)
+        _timerArm()
+
+def _timerArm():
+    global _timer
+    if _timer is None:
+        _timer = Timer(_TIMER_ID)
+    if not _timerTasks:
+        _timer.deinit()
+        return
+    now = utime.ticks_ms()
+    wait = min(utime.ticks_diff(task[2], now) for task in _timerTasks)
+    _timer.init(mode=Timer.ONE_SHOT, period=max(1, wait), callback=_timerRun)
+
+def _timerRun(t):
+    global _timerError
+    try:
+        now = utime.ticks_ms()
+        for task in tuple(_timerTasks):
+            if task not in _timerTasks:
+                continue  # removed by an earlier callback of this pass
+            if utime.ticks_diff(now, task[2]) >= 0:
+                try:
+                    task[0]()  # may change its own period with _timerPeriod()
+                except Exception as e:
+                    # drop the failing task so the others keep running
+                    if task in _timerTasks:
+                        _timerTasks.remove(task)
+                    _timerError = (task[0], e)
+                    continue
+                task[2] = utime.ticks_add(task[2], task[1])
+                if utime.ticks_diff(now, task[2]) >= 0:
+                    task[2] = utime.ticks_add(now, task[1])  # fell behind, skip ahead
+    finally:
+        _timerArm()
+
+def backgroundError(clear=True):
+    # (callback, exception) of the last background task that raised and was
+    # stopped, None if none did
+    global _timerError
+    error = _timerError
+    if clear:
+        _timerError = None
+    return error
+
+def _timerPeriod(task, period):
+    task[1] = max(1, round(period))
+
+# peripheral registry: one Pin/ADC/PWM/TouchPad per micro:bit pin, created
+# on first use and only rebuilt when the pin is used for something else
+_PIN_IN = const(0)
+_PIN_OUT = const(1)
+_PIN_ADC = const(2)
+_PIN_PWM = const(3)
+_PIN_TOUCH = const(4)
+_pins = {}
+_pinMasks = {}
+
+def _pinGet(pin, kind):
+    entry = _pins.get(pin)
+    if entry is not None:
+        if entry[0] == kind:
+            return entry[1]
+        if kind <= _PIN_OUT and entry[0] <= _PIN_OUT:
+            # plain GPIO, just switch direction
+            entry[1].init(Pin.OUT if kind == _PIN_OUT else Pin.IN)
+            entry[0] = kind
+            _pinMasks.clear()
+            return entry[1]
+        releasePin(pin)
+    if kind == _PIN_IN:
+        obj = Pin(_gpio(_digitalPins, pin), Pin.IN)
+    elif kind == _PIN_OUT:
+        obj = Pin(_gpio(_digitalPins, pin), Pin.OUT)
+    elif kind == _PIN_ADC:
+        obj = ADC(Pin(_gpio(_analogPins, pin)))
+        obj.atten(ADC.ATTN_11DB)
+    elif kind == _PIN_PWM:
+        obj = PWM(Pin(_gpio(_digitalPins, pin), Pin.OUT), freq=5000, duty=0)
+    else:
+        obj = TouchPad(Pin(_gpio(_touchpads, pin)))
+    _pins[pin] = [kind, obj]
+    _pinMasks.clear()
+    return obj
+
+def releasePin(pin):
+    _pinMasks.clear()
+    entry = _pins.pop(pin, None)
+    if entry is not None and entry[0] == _PIN_PWM:
+        entry[1].deinit()
+
 def digitalReadPin(pin):
-    return Pin(_digitalPins[pin], Pin.IN).value()
+    return _pinGet(pin, _PIN_IN).value()
 
 def digitalWritePin(pin, value):
-    Pin(_digitalPins[pin], Pin.OUT).value(value)
+    _pinGet(pin, _PIN_OUT).value(value)
+
+# batched GPIO through the ESP32 GPIO registers, pin masks use bit n for
+# micro:bit pin n; all pins below GPIO 32 are sampled/switched at once
+_GPIO_OUT_W1TS = const(0x3ff44008)
+_GPIO_OUT_W1TC = const(0x3ff4400c)
+_GPIO_OUT1_W1TS = const(0x3ff44014)
+_GPIO_OUT1_W1TC = const(0x3ff44018)
+_GPIO_IN = const(0x3ff4403c)
+_GPIO_IN1 = const(0x3ff44040)
+_PIN_MASK_VALID = const(0x19ffff)  # pins 0-16, 19 and 20
+
+def pinMask(pins):
+    mask = 0
+    for pin in pins:
+        if not _hasGPIO(_digitalPins, pin):
+            raise ValueError('no pin %r' % (pin,))
+        mask |= 1 << pin
+    return mask
+
+def _pinMaskMap(mask, kind):
+    # configure the pins and map them to GPIO bits once per mask
+    key = mask << 1 | kind
+    entry = _pinMasks.get(key)
+    if entry is None:
+        if mask < 0 or mask & ~_PIN_MASK_VALID:
+            raise ValueError('pin mask %s has bits without a pin' % hex(mask))
+        pins = []
+        low = high = 0
+        for pin in range(21):
+            if mask >> pin & 1:
+                _pinGet(pin, kind)
+                gpio = _digitalPins[pin]  # checked against _PIN_MASK_VALID
+                pins.append((pin, gpio))
+                if gpio < 32:
+                    low |= 1 << gpio
+                else:
+                    high |= 1 << (gpio - 32)
+        entry = (low, high, tuple(pins))
+        _pinMasks[key] = entry
+    return entry
+
+def digitalReadPins(pins):
+    mask = pins if isinstance(pins, int) else pinMask(pins)
+    low, high, pins = _pinMaskMap(mask, _PIN_IN)
+    low = mem32[_GPIO_IN] if low else 0
+    high = mem32[_GPIO_IN1] if high else 0
+    result = 0
+    for pin, gpio in pins:
+        if (low >> gpio if gpio < 32 else high >> (gpio - 32)) & 1:
+            result |= 1 << pin
+    return result
+
+def digitalWritePins(pins, values):
+    mask = pins if isinstance(pins, int) else pinMask(pins)
+    low, high, pins = _pinMaskMap(mask, _PIN_OUT)
+    setLow = setHigh = 0
+    for pin, gpio in pins:
+        if values >> pin & 1:
+            if gpio < 32:
+                setLow |= 1 << gpio
+            else:
+                setHigh |= 1 << (gpio - 32)
+    if low:
+        mem32[_GPIO_OUT_W1TS] = setLow
+        mem32[_GPIO_OUT_W1TC] = low & ~setLow
+    if high:
+        mem32[_GPIO_OUT1_W1TS] = setHigh
+        mem32[_GPIO_OUT1_W1TC] = high & ~setHigh
 
 def analogReadPin(pin):
-    if pin in _analogPins:
-        adc = ADC(Pin(_analogPins[pin]))
-        adc.atten(ADC.ATTN_11DB)
-        return adc.read() // 4
+    if _hasGPIO(_analogPins, pin):
+        return _pinGet(pin, _PIN_ADC).read() // 4
     else:
         return None
 
+def _pwmSet(pin, freq, duty):
+    pwm = _pinGet(pin, _PIN_PWM)
+    if pwm.freq() != freq:
+        pwm.freq(freq)
+    pwm.duty(duty)
+    return pwm
+
 def analogWritePin(pin, value, freq=5000):
-    pwm = PWM(Pin(_digitalPins[pin]), freq=freq, duty=value)
+    _pwmSet(pin, freq, value)
 
 def servoWritePin(pin, degree):
     actual_degree = int(degree * (122 - 30) / 180 + 30)
-    servo = PWM(Pin(_digitalPins[pin]), freq=50, duty=actual_degree)
+    _pwmSet(pin, 50, actual_degree)
 
 def servoWritePinOff(pin):
-    servo = PWM(Pin(_digitalPins[pin]), freq=50, duty=0)
-    servo.deinit()
+    _pinGet(pin, _PIN_PWM).duty(0)
+    releasePin(pin)
 
 def onButtonPressed(button):
-    button_a = Pin(_digitalPins[5], Pin.IN)
-    button_b = Pin(_digitalPins[11], Pin.IN)
     if button == 'AB':
-        return button_a.value() == 0 and button_b.value() == 0
+        return _pinGet(5, _PIN_IN).value() == 0 and _pinGet(11, _PIN_IN).value() == 0
     elif button == 'A':
-        return button_a.value() == 0
+        return _pinGet(5, _PIN_IN).value() == 0
     elif button == 'B':
-        return button_b.value() == 0
+        return _pinGet(11, _PIN_IN).value() == 0
     else:
         return False
 
-def pinIsTouched(pin, level=350):
-    return TouchPad(Pin(_touchpads[pin])).read() < level if pin in _touchpads else N
+# button events, see buttons.py; pin interrupts debounce and classify the
+# presses into a preallocated queue, so nothing is lost while the program
+# sleeps. A timer task only runs while a button is held, for long presses
+_buttons = None
+_buttonTask = None
+
+def startButtonEvents(debounce=20, double=300, long=800, size=32):
+    global _buttons
+    stopButtonEvents()
+    from buttons import ButtonEvents
+    _buttons = ButtonEvents((_pinGet(5, _PIN_IN), _pinGet(11, _PIN_IN)), debounce, double, long, size, _buttonHeld)
+    _buttons.start()
+
+def stopButtonEvents():
+    global _buttons
+    if _buttons:
+        _buttons.stop()
+        _buttonHeld(False)
+        _buttons = None
+
+def _buttonHeld(held):
+    global _buttonTask
+    if held and _buttonTask is None:
+        _buttonTask = _timerAdd(_buttons.poll, 20)
+    elif not held and _buttonTask is not None:
+        _timerRemove(_buttonTask)
+        _buttonTask = None
+
+def _buttonEvent(event):
+    from buttons import BUTTONS, EVENTS
+    return (BUTTONS[event[0]], EVENTS[event[1]], event[2])
+
+def buttonEvent():
+    # oldest unread event as (button, event, ticks_ms), e.g. ('A', 'click', 1234)
+    if _buttons:
+        event = _buttons.get()
+        return _buttonEvent(event) if event else None
+    else:
+        return None
+
+def buttonEvents():
+    return _buttons.any() if _buttons else 0
+
+def clearButtonEvents():
+    if _buttons:
+        _buttons.clear()
+
+def pinIsTouched(pin, level=None):
+    # adaptive state while startTouch() scans the pin, else a fixed level
+    if not _hasGPIO(_touchpads, pin):
+        return None
+    if level is None:
+        if _touch and pin in _touchPins:
+            return bool(_touch.touched & 1 << pin)
+        level = 350
+    return _pinGet(pin, _PIN_TOUCH).read() < level
+
+# adaptive touch scanning, see touch.py; every pad is read on the shared
+# timer against its own learnt baseline. Pin 11 is button B and left out
+_touch = None
+_touchTask = None
+_touchPins = ()
+
+def startTouch(pins=(1, 2, 3, 6, 7), rate=20, sensitivity=8):
+    global _touch, _touchTask, _touchPins
+    stopTouch()
+    from touch import TouchScanner
+    _touchPins = tuple(pin for pin in pins if _hasGPIO(_touchpads, pin))
+    _touch = TouchScanner([(pin, _pinGet(pin, _PIN_TOUCH)) for pin in _touchPins], sensitivity)
+    _touchTask = _timerAdd(_touch.scan, 1000 / rate)
+
+def stopTouch():
+    global _touch, _touchTask, _touchPins
+    if _touchTask:
+        _timerRemove(_touchTask)
+        _touchTask = None
+    _touch = None
+    _touchPins = ()
+
+def touchedPins():
+    # bit n set while pin n is touched
+    return _touch.touched if _touch else 0
+
+def touchEvent():
+    # oldest unread event as (pin, 'touch' or 'release', ticks_ms)
+    event = _touch.get() if _touch else None
+    return (event[0], 'touch' if event[1] else 'release', event[2]) if event else None
+
+def touchWakeup(pins=None):
+    # arm the scanned pads to wake from machine.deepsleep() when touched,
+    # False when startTouch() is not running or none of the pins is scanned
+    if _touch is None:
+        return False
+    armed = False
+    for i in range(len(_touchPins)):
+        if pins is None or _touchPins[i] in pins:
+            _pinGet(_touchPins[i], _PIN_TOUCH).config(max(1, _touch.wake_level(i)))
+            armed = True
+    if armed:
+        import esp32
+        esp32.wake_on_touch(True)
+    return armed
 
 def analogSetPitchPin(pin):
+    global _analogPitchPin
+    noTone()
     _analogPitchPin = pin
 
+def _pitchOn(freq):
+    freq = round(freq)
+    if freq > 0:
+        return _pwmSet(_analogPitchPin, freq, 512)
+    buzzer = _pinGet(_analogPitchPin, _PIN_PWM)
+    buzzer.duty(0)
+    return buzzer
+
 def analogPitch(freq, delay):
     delay = round(delay)
-    buzzer = PWM(Pin(_digitalPins[_analogPitchPin], Pin.OUT), freq=round(freq), duty=512)
+    buzzer = _pitchOn(freq)
     if delay > 0:
         if delay > 10:
             pause(delay - 10)
-            buzzer.deinit()
+            buzzer.duty(0)
             pause(10)
         else:
             pause(delay)
-            buzzer.deinit()
+            buzzer.duty(0)
 
 def playTone(note, delay=0):
-    analogPitch(freq=_tones.get(note, 0.0), delay=delay)
+    analogPitch(freq=_noteFreqs[_noteIndex(note)], delay=delay)
 
 def rest(delay=0):
     playTone(note='*', delay=delay)
 
 def noTone():
-    buzzer = PWM(Pin(_digitalPins[_analogPitchPin], Pin.OUT), freq=0, duty=512)
-    buzzer.deinit()
+    stopMusic()
+    _pinGet(_analogPitchPin, _PIN_PWM).duty(0)
+    releasePin(_analogPitchPin)
+
+# background music: a score is packed bytes of (note, length) pairs, note is
+# the index in _noteFreqs (0 = rest, 1 = C3 ... 49 = C7) and length is in
+# 1/32 notes; it is played from the shared timer on one persistent PWM
+_noteFreqs = (0, 131, 139, 147, 156, 165, 175, 185, 196, 208, 220, 233, 247,
+              262, 277, 294, 311, 330, 349, 370, 392, 415, 440, 466, 494,
+              523, 554, 587, 622, 659, 698, 740, 784, 831, 880, 932, 988,
+              1047, 1109, 1175, 1245, 1319, 1397, 1480, 1568, 1661, 1760, 1865, 1976,
+              2093)
+_noteNames = 'C.D.EF.G.A.B'
+_musicGap = 10
+_musicPWM = None
+_musicTask = None
+_musicScore = b''
+_musicPos = 0
+_musicUnit = 62.5
+_musicLoop = False
+_musicQueue = []
+_musicRelease = 0
+
+def _noteIndex(note):
+    # 'C3' to 'C7', sharps written as 'C3D3'; 0 (rest) for anything else
+    if len(note) == 2 and note[0] in 'CDEFGAB' and note[1] in '34567':
+        index = (int(note[1]) - 3) * 12 + _noteNames.find(note[0]) + 1
+        return index if index <= 49 else 0
+    if len(note) == 4:
+        index = _noteIndex(note[:2])
+        return index + 1 if index and _noteIndex(note[2:]) == index + 2 else 0
+    return 0
+
+def packMusic(notes):
+    # notes: sequence of (note name, length in 1/32 notes), e.g. (('D4', 8), ('G4', 16))
+    score = bytearray()
+    for note, length in notes:
+        score.append(_noteIndex(note))
+        score.append(length)
+    return bytes(score)
+
+def parseRTTTL(text):
+    # returns (score, tempo in bpm)
+    parts = text.split(':')
+    defaults = {'d':4, 'o':6, 'b':63}
+    for item in parts[1].split(','):
+        if '=' in item:
+            key, value = item.split('=')
+            defaults[key.strip().lower()] = int(value)
+    score = bytearray()
+    for item in parts[2].split(','):
+        item = item.strip().lower()
+        if not item:
+            continue
+        i = 0
+        while i < len(item) and item[i].isdigit():
+            i += 1
+        duration = int(item[:i]) if i else defaults['d']
+        name = item[i]
+        i += 1
+        semitone = 0
+        if i < len(item) and item[i] == '#':
+            semitone = 1
+            i += 1
+        dotted = '.' in item[i:]
+        octave = item[i:].replace('.', '')
+        octave = int(octave) if octave else defaults['o']
+        length = 32 // duration
+        if dotted:
+            length += length // 2
+        if name == 'p':
+            note = 0
+        else:
+            note = (octave - 3) * 12 + _noteNames.find('B' if name == 'h' else name.upper()) + semitone + 1
+            while note < 1:
+                note += 12
+            while note > 49:
+                note -= 12
+        score.append(note)
+        score.append(max(1, length))
+    return bytes(score), defaults['b']
+
+def playMusic(score, tempo=None, loop=False):
+    global _musicPWM, _musicTask, _musicScore, _musicPos, _musicLoop, _musicRelease
+    stopMusic()
+    if isinstance(score, str):
+        score, bpm = parseRTTTL(score)
+        tempo = tempo or bpm
+    setMusicTempo(tempo or 120)
+    _musicScore = score
+    _musicPos = 0
+    _musicLoop = loop
+    _musicRelease = 0
+    _musicPWM = _pinGet(_analogPitchPin, _PIN_PWM)
+    _musicTask = _timerAdd(_musicStep, 1)
+
+def queueMusic(score):
+    if isinstance(score, str):
+        score = parseRTTTL(score)[0]
+    if _musicTask:
+        _musicQueue.append(score)
+    else:
+        playMusic(score)
+
+def setMusicTempo(tempo):
+    # tempo in quarter notes per minute
+    global _musicUnit
+    _musicUnit = 60000 / tempo / 8
+
+def stopMusic():
+    global _musicPWM, _musicTask
+    if _musicTask:
+        _timerRemove(_musicTask)
+        _musicTask = None
+    if _musicPWM:
+        _musicPWM.duty(0)
+        _musicPWM = None
+    _musicQueue.clear()
+
+def musicPlaying():
+    return _musicTask is not None
+
+def _musicStep():
+    global _musicScore, _musicPos, _musicRelease
+    if _musicRelease:
+        # short silence between notes so repeated notes stay apart
+        _musicPWM.duty(0)
+        _timerPeriod(_musicTask, _musicRelease)
+        _musicRelease = 0
+        return
+    if _musicPos >= len(_musicScore):
+        if _musicQueue:
+            _musicScore = _musicQueue.pop(0)
+        elif not _musicLoop:
+            stopMusic()
+            return
+        _musicPos = 0
+    note = _musicScore[_musicPos]
+    duration = round(_musicScore[_musicPos + 1] * _musicUnit)
+    _musicPos += 2
+    if note:
+        _musicPWM.freq(_noteFreqs[note])
+        _musicPWM.duty(512)
+    else:
+        _musicPWM.duty(0)
+    if duration > _musicGap * 2:
+        _musicRelease = _musicGap
+        duration -= _musicGap
+    _timerPeriod(_musicTask, duration)
+
+def _sensor(gpio):
+    adc = _sensors.get(gpio)
+    if adc is None:
+        adc = ADC(Pin(gpio))
+        adc.atten(ADC.ATTN_11DB)
+        _sensors[gpio] = adc
+    return adc
 
 def lightLevelL():
-    return _lightSensorL.read() // 4
+    return _sensor(_LIGHT_L).read() // 4
 
 def lightLevelR():
-    return _lightSensorR.read() // 4
+    return _sensor(_LIGHT_R).read() // 4
 
 def lightLevel():
-    return (_lightSensorL.read() + _lightSensorR.read()) / 2 // 4
+    return (_sensor(_LIGHT_L).read() + _sensor(_LIGHT_R).read()) / 2 // 4
 
 def temperatureRaw():
-    return _thermistor.read() // 4
+    return _sensor(_THERMISTOR).read() // 4
 
-def temperature(rntc=5100):
-    # see https://github.com/BPI-STEAM/BPI-BIT-Hardware/blob/master/docs/NTC-0805-103F-3950F.pdf
-    return 3950 / math.log((3.3 * rntc / (_thermistor.read() / 4095 * 3.3) - rntc) / (10000 * math.exp(-3950 / (273.15 + 25)))) - 273.15
+# NTC curve in centi-degrees at every 32nd ADC code, built once per
+# rntc/beta and linearly interpolated in between
+# see https://github.com/BPI-STEAM/BPI-BIT-Hardware/blob/master/docs/NTC-0805-103F-3950F.pdf
+_ntcTable = None
+_ntcKey = None
 
-def acceleration(axis=''):
-    if _mpu9250:
+def _ntcBuild(rntc, beta):
+    global _ntcTable, _ntcKey
+    from array import array
+    rinf = 10000 * math.exp(-beta / (273.15 + 25))
+    table = array('i', (0 for _ in range(129)))
+    for i in range(129):
+        code = min(max(i * 32, 1), 4094)
+        table[i] = round((beta / math.log(rntc * (4095 / code - 1) / rinf) - 273.15) * 100)
+    _ntcTable = table
+    _ntcKey = (rntc, beta)
+
+def temperatureCenti(rntc=5100, beta=3950, raw=None):
+    # raw: 12-bit thermistor ADC code (for example from sampledValue), read if None
+    if _ntcKey is None or _ntcKey[0] != rntc or _ntcKey[1] != beta:
+        _ntcBuild(rntc, beta)
+    code = _sensor(_THERMISTOR).read() if raw is None else raw
+    i = code >> 5
+    low = _ntcTable[i]
+    return low + ((_ntcTable[i + 1] - low) * (code & 31) >> 5)
+
+def temperature(rntc=5100, beta=3950, raw=None):
+    return temperatureCenti(rntc, beta, raw) / 100
+
+# background ADC acquisition, see adcsampler.py; channels are 'lightL',
+# 'lightR', 'temperature' or analog pin 1/2, values are 12-bit (0-4095)
+_samplerFilters = {'none':0, 'average':1, 'median':2}
+_sampler = None
+_samplerTask = None
+_samplerChannels = ()
+
+def startSampling(channels=('lightL', 'lightR', 'temperature'), rate=100, oversample=4, filter='average', window=4, size=64):
+    global _sampler, _samplerTask, _samplerChannels
+    from adcsampler import ADCSampler
+    stopSampling()
+    sensors = {'lightL':_LIGHT_L, 'lightR':_LIGHT_R, 'temperature':_THERMISTOR}
+    adcs = [_sensor(sensors[c]) if c in sensors else _pinGet(c, _PIN_ADC) for c in channels]
+    _samplerChannels = tuple(channels)
+    _sampler = ADCSampler(adcs, size=size, oversample=oversample, filter=_samplerFilters[filter], window=window)
+    _samplerTask = _timerAdd(_sampler.sample, 1000 / rate)
+
+def stopSampling():
+    global _samplerTask
+    if _samplerTask:
+        _timerRemove(_samplerTask)
+        _samplerTask = None
+
+def sampledValue(channel):
+    return _sampler.latest(_samplerChannels.index(channel)) if channel in _samplerChannels else None
+
+def sampledBuffer(channel):
+    # (ring buffer, index of the next write, number of valid values), no copy
+    if channel in _samplerChannels:
+        return _sampler.buffer(_samplerChannels.index(channel)), _sampler.head, _sampler.count
+    else:
+        return None
+
+# raw sensor codes for logging and telemetry, read into arrays shared by
+# both; channel bits: accel 1, gyro 2, magnetic 4, light 8, temperature 16
+_rawChannels = {'accel':1, 'gyro':2, 'magnetic':4, 'light':8, 'temperature':16}
+_rawIMU = None
+_rawMag = None
+_rawADC = None
+
+def _rawMask(channels):
+    global _rawIMU, _rawMag, _rawADC
+    mask = 0
+    for channel in channels:
+        mask |= _rawChannels[channel]
+    if mask & 7 and not _imu():
+        return 0
+    if _rawIMU is None:
+        from array import array
+        _rawIMU = array('h', bytes(14))  # AX, AY, AZ, TEMP, GX, GY, GZ
+        _rawMag = array('h', bytes(6))
+        _rawADC = array('H', bytes(6))  # light L, light R, thermistor
+    return mask
+
+def _rawSample(mask):
+    if mask & 3:
+        _mpu9250.mpu6500.sample_raw_into(_rawIMU)
+    if mask & 4:
+        _mpu9250.ak8963.magnetic_raw_into(_rawMag)
+    if mask & 8:
+        _rawADC[0] = _sensor(_LIGHT_L).read()
+        _rawADC[1] = _sensor(_LIGHT_R).read()
+    if mask & 16:
+        _rawADC[2] = _sensor(_THERMISTOR).read()
+
+# binary sensor logging, see logger.py; raw records are packed into a page
+# buffer on the shared timer and whole pages go to rotating segment files
+_logger = None
+_logTask = None
+
+def startLogging(channels=('accel', 'light', 'temperature'), rate=100, prefix='log', segments=4, segmentPages=64):
+    global _logger, _logTask
+    stopLogging()
+    mask = _rawMask(channels)
+    if not mask:
+        return False
+    from logger import Logger
+    _logger = Logger(prefix, mask, segments, segmentPages)
+    _rawRange()
+    _logTask = _timerAdd(_logStep, 1000 / rate)
+    return True
+
+def stopLogging():
+    global _logger, _logTask
+    if _logTask:
+        _timerRemove(_logTask)
+        _logTask = None
+    if _logger:
+        _logger.close()
+        _logger = None
+
+def _logStep():
+    _rawSample(_logger.channels)
+    _logger.record(utime.ticks_ms(), _rawIMU, _rawMag, _rawADC[0], _rawADC[1], _rawADC[2])
+
+def loggingStatus():
+    # (records, pages written) since startLogging(), None when not logging
+    return (_logger.records, _logger.pages) if _logger else None
+
+# framed binary telemetry, see telemetry.py; one CRC checked frame of raw
+# codes per timer tick to a UART, or to the USB serial port by default
+_telemetry = None
+_telemetryTask = None
+
+def startTelemetry(channels=('accel', 'gyro'), rate=100, uart=None):
+    global _telemetry, _telemetryTask
+    stopTelemetry()
+    mask = _rawMask(channels)
+    if not mask:
+        return False
+    from telemetry import Telemetry
+    if uart is None:
+        import sys
+        uart = sys.stdout.buffer
+    _telemetry = Telemetry(uart, mask)
+    _rawRange()
+    _telemetryTask = _timerAdd(_telemetryStep, 1000 / rate)
+    return True
+
+def stopTelemetry():
+    global _telemetry, _telemetryTask
+    if _telemetryTask:
+        _timerRemove(_telemetryTask)
+        _telemetryTask = None
+    _telemetry = None
+
+def _telemetryStep():
+    _rawSample(_telemetry.channels)
+    _telemetry.send(utime.ticks_us(), _rawIMU, _rawMag, _rawADC)
+
+def telemetryStatus():
+    # (frames sent, frames not fully written), None when not streaming
+    return (_telemetry.sent, _telemetry.short) if _telemetry else None
+
+def _rawRange():
+    # the accelerometer range goes with the raw codes, gestures change it
+    # while logging or telemetry may run
+    code = _mpu9250.mpu6500.accel_range() >> 3 if _mpu9250 else 0
+    if _logger:
+        _logger.set_accel_range(code)
+    if _telemetry:
+        _telemetry.set_accel_range(code)
+
+def sampleIMU(magnetic=True):
+    global _imuAccel, _imuGyro, _imuMag
+    if _imu():
+        _imuAccel, _imuGyro, mag, _ = _mpu9250.sample(magnetic)
+        if magnetic:
+            _imuMag = mag
+        return _imuAccel, _imuGyro, _imuMag
+    else:
+        return None
+
+def _sampleMagnetic():
+    global _imuMag
+    _imuMag = _mpu9250.magnetic
+
+def acceleration(axis='', refresh=True):
+    if _imu():
+        if refresh:
+            sampleIMU(False)
         if axis == '':
-            return abs(_mpu9250.acceleration[_axisName['x']]) + abs(_mpu9250.acceleration[_axisName['y']]) + abs(_mpu9250.acceleration[_axisName['x']])
+            return abs(_imuAccel[0]) + abs(_imuAccel[1]) + abs(_imuAccel[2])
         else:
-            return _mpu9250.acceleration[_axisName[axis]] if axis in _axisName else None
+            return _imuAccel[_axisName.index(axis)] if axis in _axisName else None
     else:
         return None
 
-def rotationPitch():
-    if _mpu9250:
-        return (180 / math.pi) * math.atan2(acceleration('y'), math.sqrt(math.pow(acceleration('x'), 2) + math.pow(acceleration('z'), 2)))
+def rotationPitch(refresh=True):
+    if _imu():
+        if refresh:
+            sampleIMU(False)
+        x, y, z = _imuAccel
+        return (180 / math.pi) * math.atan2(y, math.sqrt(x * x + z * z))
     else:
         return None
 
-def rotationRoll():
-    if _mpu9250:
-        return (180 / math.pi) * math.atan2(acceleration('x'), math.sqrt(math.pow(acceleration('y'), 2) + math.pow(acceleration('z'), 2)))
+def rotationRoll(refresh=True):
+    if _imu():
+        if refresh:
+            sampleIMU(False)
+        x, y, z = _imuAccel
+        return (180 / math.pi) * math.atan2(x, math.sqrt(y * y + z * z))
     else:
         return None
 
-def gyroscope(axis):
-    if _mpu9250:
-        return _mpu9250.gyro[_axisName[axis]] if axis in _axisName else None
+def gyroscope(axis, refresh=True):
+    if _imu():
+        if refresh:
+            sampleIMU(False)
+        return _imuGyro[_axisName.index(axis)] if axis in _axisName else None
     else:
         return None
 
-def magneticForce(axis=''):
-    if _mpu9250:
+def magneticForce(axis='', refresh=True):
+    if _imu():
+        if refresh:
+            _sampleMagnetic()
         if axis == '':
-            return abs(_mpu9250.magnetic[_axisName['x']]) + abs(_mpu9250.magnetic[_axisName['y']]) + abs(_mpu9250.magnetic[_axisName['z']])
+            return abs(_imuMag[0]) + abs(_imuMag[1]) + abs(_imuMag[2])
         else:
-            return _mpu9250.magnetic[_axisName[axis]] if axis in _axisName else None
+            return _imuMag[_axisName.index(axis)] if axis in _axisName else None
     else:
         return None
 
-def compassHeading():
-    if _mpu9250:
-        return (180 / math.pi) * math.atan2(magneticForce('y'), magneticForce('x'))
+def compassHeading(refresh=True):
+    if _imu():
+        if refresh:
+            _sampleMagnetic()
+        return (180 / math.pi) * math.atan2(_imuMag[1], _imuMag[0])
+    else:
+        return None
+
+# orientation sensor fusion, see ahrs.py
+_ahrs = None
+_ahrsTask = None
+_ahrsTicks = 0
+_ahrsMagnetic = True
+
+def startFusion(rate=100, beta=0.1, magnetic=True):
+    global _ahrs, _ahrsTask, _ahrsTicks, _ahrsMagnetic
+    if _imu():
+        from ahrs import AHRS
+        stopFusion()
+        _ahrs = AHRS(beta)
+        _ahrsMagnetic = magnetic
+        _ahrsTicks = utime.ticks_us()
+        _ahrsTask = _timerAdd(_fusionStep, 1000 / rate)
+
+def stopFusion():
+    global _ahrsTask
+    if _ahrsTask:
+        _timerRemove(_ahrsTask)
+        _ahrsTask = None
+
+def _fusionStep():
+    global _ahrsTicks
+    now = utime.ticks_us()
+    dt = utime.ticks_diff(now, _ahrsTicks) / 1000000
+    _ahrsTicks = now
+    a, g, m = sampleIMU(_ahrsMagnetic)
+    if _ahrsMagnetic:
+        # AK8963 axes are X = MPU Y, Y = MPU X, Z = -MPU Z
+        _ahrs.update(a[0], a[1], a[2], g[0], g[1], g[2], m[1], m[0], -m[2], dt)
+    else:
+        _ahrs.update_imu(a[0], a[1], a[2], g[0], g[1], g[2], dt)
+
+def fusionPitch():
+    return _ahrs.roll if _ahrs else None
+
+def fusionRoll():
+    return -_ahrs.pitch if _ahrs else None
+
+def fusionHeading():
+    # same reference as compassHeading(), which measures from the AK8963 X axis
+    if _ahrs:
+        heading = _ahrs.yaw + 90
+        return heading - 360 if heading > 180 else heading
+    else:
+        return None
+
+def fusionQuaternion():
+    return tuple(_ahrs.q) if _ahrs else None
+
+def startIMUSampling(pin, rate=100):
+    if _imu():
+        _mpu9250.irq_start(Pin(pin, Pin.IN), _imuDispatch, rate)
+
+def stopIMUSampling():
+    if _imu():
+        _mpu9250.irq_stop()
+
+def onIMUSample(callback):
+    if callback not in _imuHandlers:
+        _imuHandlers.append(callback)
+
+def removeIMUSample(callback):
+    if callback in _imuHandlers:
+        _imuHandlers.remove(callback)
+
+def _imuDispatch(sample, ticks):
+    for handler in _imuHandlers:
+        handler(sample, ticks)
+
+# accelerometer gestures, see gesture.py; fed by the data ready interrupt
+# when a pin is given, otherwise by the shared timer. The accelerometer
+# runs at +/-8 g meanwhile so the 3g and 6g gestures can be seen
+_gestures = None
+_gestureTask = None
+_gestureSample = None
+_gestureHandlers = {}
+_gestureRange = None  # accelerometer range before startGestures()
+_gestureIRQ = False  # startGestures() started the IRQ sampling
+
+def startGestures(rate=50, pin=None):
+    # with pin, IMU sampling that already runs keeps its own rate
+    global _gestures, _gestureTask, _gestureSample, _gestureRange, _gestureIRQ
+    if _imu():
+        stopGestures()
+        from gesture import GestureDetector
+        from mpu6500 import ACCEL_FS_SEL_8G
+        mpu6500 = _mpu9250.mpu6500
+        _gestureRange = mpu6500.accel_range()
+        _gestures = GestureDetector(one_g=mpu6500.accel_range(ACCEL_FS_SEL_8G))
+        _rawRange()
+        if pin is None:
+            from array import array
+            _gestureSample = array('h', bytes(14))
+            _gestureTask = _timerAdd(_gestureTick, 1000 / rate)
+        else:
+            onIMUSample(_gestureFeed)
+            if not mpu6500.irq_running:
+                startIMUSampling(pin, rate)
+                _gestureIRQ = True
+
+def stopGestures():
+    global _gestures, _gestureTask, _gestureIRQ
+    if _gestureTask:
+        _timerRemove(_gestureTask)
+        _gestureTask = None
+    if _gestureFeed in _imuHandlers:
+        removeIMUSample(_gestureFeed)
+        if _gestureIRQ and not _imuHandlers:
+            stopIMUSampling()
+    _gestureIRQ = False
+    if _gestures:
+        _mpu9250.mpu6500.accel_range(_gestureRange)
+        _gestures = None
+        _rawRange()
+
+def _gestureTick():
+    _mpu9250.mpu6500.sample_raw_into(_gestureSample)
+    _gestureFeed(_gestureSample, 0)
+
+def _gestureFeed(sample, ticks):
+    if _gestures.update(sample[0], sample[1], sample[2]):
+        gesture = _gestures.get()
+        while gesture:
+            for handler in _gestureHandlers.get(gesture, ()):
+                handler()
+            gesture = _gestures.get()
+
+def _gestureCode(name):
+    from gesture import NAMES
+    return NAMES.index(name) if name in NAMES[1:] else None
+
+def onGesture(name, callback):
+    code = _gestureCode(name)
+    if code is not None:
+        handlers = _gestureHandlers.setdefault(code, [])
+        if callback not in handlers:
+            handlers.append(callback)
+
+def removeGesture(name, callback):
+    handlers = _gestureHandlers.get(_gestureCode(name), [])
+    if callback in handlers:
+        handlers.remove(callback)
+
+def currentGesture():
+    # shake, freefall, 6g or 3g while in progress, else the orientation
+    if _gestures:
+        from gesture import NAMES, SHAKE, FREEFALL, G6, G3
+        for code in (SHAKE, FREEFALL, G6, G3):
+            if _gestures.active(code):
+                return NAMES[code]
+        return NAMES[_gestures.orientation]
     else:
         return None
 
-def calibrateCompass():
+def isGesture(name):
+    code = _gestureCode(name)
+    return bool(_gestures and code and _gestures.active(code))
+
+def wasGesture(name):
+    # seen since the last wasGesture() call for this gesture
+    code = _gestureCode(name)
+    if _gestures and code and _gestures.seen & 1 << code:
+        _gestures.seen &= ~(1 << code)
+        return True
+    return False
+
+def _calSave():
+    values = _mpu9250.ak8963.offset + _mpu9250.ak8963.scale + _mpu9250.mpu6500.gyro_offset
+    with open(_CAL_FILE, 'wb') as f:
+        f.write(ustruct.pack(_CAL_FORMAT, _CAL_MAGIC, *values))
+
+def clearCalibration():
+    try:
+        import os
+        os.remove(_CAL_FILE)
+    except OSError:
+        pass
     if _mpu9250:
-        i2c = I2C(scl=Pin(22), sda=Pin(21), freq=400000)
+        _mpu9250.ak8963.set_calibration()
+        _mpu9250.mpu6500.set_gyro_offset()
+
+def calibrateCompass(count=150, delay=100):
+    if _imu():
         print('Calibrating compass: keep turning BPI:BIT for 15 seconds.')
-        ak8963 = AK8963(i2c)
-        offset, scale = ak8963.calibrate(count=150, delay=100)
+        result = _mpu9250.ak8963.calibrate(count=count, delay=delay)
+        if result is None:
+            print('Calibration failed: turn BPI:BIT around every axis. The previous calibration is kept.')
+            return
+        offset, scale = result
+        _calSave()
         print('Calibration completed.')
         print('AK8963 offset:')
         print(offset)
         print('AK8963 scale:')
         print(scale)
-        _mpu9250 = MPU9250(i2c, ak8963=ak8963)
+
+def calibrateGyro(count=256, delay=0):
+    # keep the board still
+    if _imu():
+        offset = _mpu9250.mpu6500.calibrate(count=count, delay=delay)
+        _calSave()
+        return offset
+    else:
+        return None
+
+# background compass calibration, one min/max step per timer tick; the
+# current calibration stays in use until the last step
+_calTask = None
+_calCount = 0
+_calTotal = 0
+_calFailed = False
+
+def startCompassCalibration(count=150, period=100):
+    global _calTask, _calCount, _calTotal, _calFailed
+    if _imu():
+        stopCompassCalibration()
+        _calFailed = False
+        _mpu9250.ak8963.calibrate_begin()
+        _calCount = 0
+        _calTotal = count
+        _calTask = _timerAdd(_calStep, period)
+
+def _calStep():
+    global _calCount, _calTask, _calFailed
+    try:
+        _mpu9250.ak8963.calibrate_step()
+        _calCount += 1
+        if _calCount < _calTotal:
+            return
+        # None when an axis never changed, the old calibration stays
+        _calFailed = _mpu9250.ak8963.calibrate_end() is None
+        if not _calFailed:
+            _calSave()
+    except OSError:
+        _calFailed = True
+    _timerRemove(_calTask)
+    _calTask = None
+
+def stopCompassCalibration():
+    # cancel, the previous calibration stays in use
+    global _calTask
+    if _calTask:
+        _timerRemove(_calTask)
+        _calTask = None
+
+def compassCalibrationProgress():
+    # 0-99 while running, 100 when done, -1 when the last calibration failed
+    if _calTask:
+        return 100 * _calCount // _calTotal
+    return -1 if _calFailed else 100
+
+def _ledSet(pixel, color):
+    # color is a packed 0xRRGGBB int or an (r, g, b) tuple, the back buffer
+    # uses the NeoPixel GRB byte order
+    i = pixel * 3
+    if type(color) is int:
+        _ledBack[i] = color >> 8 & 0xFF
+        _ledBack[i + 1] = color >> 16
+        _ledBack[i + 2] = color & 0xFF
+    else:
+        _ledBack[i] = color[1]
+        _ledBack[i + 1] = color[0]
+        _ledBack[i + 2] = color[2]
+
+def _ledFill(color):
+    _ledSet(0, color)
+    g, r, b = _ledBack[0], _ledBack[1], _ledBack[2]
+    for i in range(3, 75, 3):
+        _ledBack[i] = g
+        _ledBack[i + 1] = r
+        _ledBack[i + 2] = b
+
+@micropython.native
+def _ledMap(front, back, lut):
+    for i in range(75):
+        front[i] = lut[back[i]]
+
+def ledShow(force=False):
+    global _neoPixel, _ledFront, _ledDirty
+    if _neoPixel is None:
+        _neoPixel = NeoPixel(Pin(4, Pin.OUT), 25)
+        if _stats:
+            _neoPixel = _stats.neopixel(_neoPixel)
+        _ledFront = _neoPixel.buf
+        _ledLUTMake()
+        force = True
+    if force or _ledDirty or _ledBack != _ledShown:
+        _ledDirty = False
+        _ledShown[:] = _ledBack
+        if _ledLUT is None:
+            _ledFront[:] = _ledBack
+        else:
+            _ledMap(_ledFront, _ledBack, _ledLUT)
+        _neoPixel.write()
+
+def _ledLUTMake():
+    # one table for gamma and brightness, applied when the strip is written
+    global _ledLUT, _ledDirty
+    if _ledBrightness == 255 and _ledGamma == 1.0:
+        _ledLUT = None
+    else:
+        _ledLUT = bytes(int((i / 255) ** _ledGamma * _ledBrightness + 0.5) for i in range(256))
+    _ledDirty = True
+
+def _ledLUTBuild():
+    _ledLUTMake()
+    _ledFlush()
+
+def ledBrightness(level=None):
+    # 0 to 255 for all LEDs, returns the current level when called without
+    global _ledBrightness
+    if level is None:
+        return _ledBrightness
+    _ledBrightness = min(255, max(0, int(level)))
+    _ledLUTBuild()
+
+def ledGamma(gamma=None):
+    # 1.0 is linear, 2.2 or so makes fades look even to the eye
+    global _ledGamma
+    if gamma is None:
+        return _ledGamma
+    _ledGamma = gamma
+    _ledLUTBuild()
+
+def rgb(r, g, b):
+    # packed 0xRRGGBB color, usable wherever an (r, g, b) tuple is
+    return (r & 0xFF) << 16 | (g & 0xFF) << 8 | b & 0xFF
+
+def hsv(h, s=255, v=255):
+    # hue 0-359, saturation and value 0-255 to a packed color, integers only
+    h %= 360
+    region = h // 60
+    f = (h - region * 60) * 255 // 60
+    p = v * (255 - s) // 255
+    q = v * (255 - s * f // 255) // 255
+    t = v * (255 - s * (255 - f) // 255) // 255
+    if region == 0:
+        return v << 16 | t << 8 | p
+    elif region == 1:
+        return q << 16 | v << 8 | p
+    elif region == 2:
+        return p << 16 | v << 8 | t
+    elif region == 3:
+        return p << 16 | q << 8 | v
+    elif region == 4:
+        return t << 16 | p << 8 | v
+    else:
+        return v << 16 | p << 8 | q
+
+def _codeColor(color):
+    level = _ledCodeLevel
+    return ((color >> 16) * level + 127) // 255 << 16 | ((color >> 8 & 0xFF) * level + 127) // 255 << 8 | ((color & 0xFF) * level + 127) // 255
+
+def ledPalette(code, color):
+    # add or change a one character color code, full scale like the others
+    _colorPalette[code] = color if type(color) is int else rgb(*color)
+    _colorCodes[code] = _codeColor(_colorPalette[code])
+
+def ledCodeBrightness(level=None):
+    # 0 to 255 for the color codes only, 48 by default; raw colors are not
+    # touched by it
+    global _ledCodeLevel
+    if level is None:
+        return _ledCodeLevel
+    _ledCodeLevel = min(255, max(0, int(level)))
+    for code in _colorPalette:
+        _colorCodes[code] = _codeColor(_colorPalette[code])
+
+def ledAutoShow(enabled=True):
+    global _ledAuto
+    _ledAuto = enabled
+    if enabled:
+        ledShow()
+
+def _ledFlush():
+    if _ledAuto:
+        ledShow()
 
 def led(index, color):
-    _neoPixel[_ledScreen[index]] = color
-    _neoPixel.write()
+    _ledSet(_ledScreen[index], color)
+    _ledFlush()
 
 def ledAll(color):
-    _neoPixel.fill(color)
-    _neoPixel.write()
+    _ledFill(color)
+    _ledFlush()
 
 def ledCode(index, code):
-    _neoPixel[_ledScreen[index]] = _colorCodes[code]
-    _neoPixel.write()
+    _ledSet(_ledScreen[index], _colorCodes[code])
+    _ledFlush()
 
 def ledCodeAll(code):
-    _neoPixel.fill(_colorCodes[code])
-    _neoPixel.write()
+    _ledFill(_colorCodes[code])
+    _ledFlush()
 
 def ledCodeArray(array):
     for i in range(25):
-        _neoPixel[i] = _colorCodes[array[_ledScreen[i]]]
-    _neoPixel.write()
+        _ledSet(i, _colorCodes[array[_ledScreen[i]]])
+    _ledFlush()
+
+def ledCodeRow(row, codes):
+    # row 0 is the top row, codes from left to right
+    for col in range(5):
+        _ledSet((4 - col) * 5 + row, _colorCodes[codes[col]])
+    _ledFlush()
+
+def ledCodeColumn(col, codes):
+    # column 0 is the left column, codes from top to bottom
+    for row in range(5):
+        _ledSet((4 - col) * 5 + row, _colorCodes[codes[row]])
+    _ledFlush()
+
+def ledBlit(buf):
+    # 75 bytes in NeoPixel order (GRB), pixel 0 is the top-right LED
+    _ledBack[:] = buf
+    _ledFlush()
 
 def ledOff():
     ledCodeAll('*')
 
+# bar graph fill order: LED n (ledCodeArray order) lights from _barRank[n] / 25
+_barRank = b'\x18\x16\x15\x17\x19\x13\x11\x10\x12\x14\x0e\x0c\x0b\x0d\x0f\x09\x07\x06\x08\x0a\x04\x02\x01\x03\x05'
+
 def plotBarGraph(value, maxValue=1023, code='W'):
-    p = value / maxValue
-    valueArray = [0.96, 0.88, 0.84, 0.92, 1.00, 0.76, 0.68, 0.64, 0.72, 0.80, 0.56, 0.48, 0.44, 0.52, 0.60, 0.36, 0.28, 0.24, 0.32, 0.40, 0.16, 0.08, 0.04, 0.12, 0.20]
-    ledArray = []
+    color = _colorCodes[code]
+    black = _colorCodes['*']
+    level = value * 25
     for i in range(25):
-        ledArray.append(code if p >= valueArray[i] else '*')
-    ledCodeArray(ledArray)
+        _ledSet(i, color if level >= _barRank[_ledScreen[i]] * maxValue else black)
+    _ledFlush()
 
-def scrollText(text, delay=150, code='W'):
-    ledMain = ['*'] * 25
-    ledBuff = ['*'] * 25
-    scrolltime = 0
-    c = ''
+def _fontIndex(char):
+    i = _fontChars.find(char)
+    return _fontSpace if i < 0 or len(char) != 1 else i
+
+def _ledColumns(columns, color):
+    # columns: 5 bitmasks from left to right, bit 0 = top row
+    black = _colorCodes['*']
+    for col in range(5):
+        bits = columns[col]
+        pixel = (4 - col) * 5
+        for row in range(5):
+            _ledSet(pixel + row, color if bits >> row & 1 else black)
+    _ledFlush()
+
+def _textColumns(text):
+    # the whole message as a stream of column bitmasks, one per scroll step
+    columns = bytearray()
+    last = len(text) - 1
     for l, t in enumerate(text):
-        c = t if t in _fonts.keys() else ' '
-        for i in range(25):
-            ledBuff[i] = code if _fonts[c][i] != '*' else '*'
-        scrolltime = 10 if l == len(text) - 1 else _fontsWidth[c] + 1
+        glyph = _fontIndex(t) * 5
+        scrolltime = 10 if l == last else _fontWidths[glyph // 5] + 1
         for i in range(scrolltime):
-            tmp = [ledBuff[0], ledBuff[5], ledBuff[10], ledBuff[15], ledBuff[20]]
-            for j in range(5):
-                for k in range(5):
-                    index = j + k * 5
-                    if j < 4:
-                        ledMain[index] = ledMain[index + 1]
-                        ledBuff[index] = ledBuff[index + 1]
-                    else:
-                        ledMain[index] = tmp[k]
-                        ledBuff[index] = '*'
-            ledCodeArray(ledMain)
-            pause(delay)
+            columns.append(_fontData[glyph + i] if i < 5 else 0)
+    return columns
+
+def _scrollStep(screen, column, color):
+    for col in range(4):
+        screen[col] = screen[col + 1]
+    screen[4] = column
+    _ledColumns(screen, color)
+
+def scrollText(text, delay=150, code='W'):
+    color = _colorCodes[code]
+    screen = bytearray(5)
+    for column in _textColumns(text):
+        _scrollStep(screen, column, color)
+        pause(delay)
+
+_scrollScreen = bytearray(5)
+_scrollColumns = b''
+_scrollPos = 0
+_scrollColor = 0
+_scrollLoop = False
+_scrollTask = None
+
+def scrollTextStart(text, delay=150, code='W', loop=False, timer=True):
+    global _scrollTask, _scrollLoop
+    scrollTextStop()
+    stopAnimation()
+    stopChart()
+    for i in range(5):
+        _scrollScreen[i] = 0
+    scrollTextSet(text, code)
+    _scrollLoop = loop
+    if timer:
+        _scrollTask = _timerAdd(scrollTextTick, delay)
+
+def scrollTextSet(text, code=None):
+    # swap the message on the fly, the screen keeps scrolling from where it is
+    global _scrollColumns, _scrollPos, _scrollColor
+    _scrollColumns = _textColumns(text)
+    _scrollPos = 0
+    if code is not None:
+        _scrollColor = _colorCodes[code]
+
+def scrollTextTick():
+    global _scrollPos
+    if _scrollPos >= len(_scrollColumns):
+        if not _scrollLoop or not _scrollColumns:
+            scrollTextStop()
+            return False
+        _scrollPos = 0
+    _scrollStep(_scrollScreen, _scrollColumns[_scrollPos], _scrollColor)
+    _scrollPos += 1
+    return True
+
+def scrollTextStop():
+    global _scrollTask
+    if _scrollTask:
+        _timerRemove(_scrollTask)
+        _scrollTask = None
+
+def scrollTextRunning():
+    return _scrollTask is not None
+
+# precompiled animations, see animation.py: every tick copies one packed
+# frame into the back buffer and re-arms the timer for that frame's duration
+_animation = None
+_animationPos = 0
+_animationLoop = False
+_animationTask = None
+
+def compileAnimation(frames, durations=100, loop=True):
+    # frames: 25 color codes each as for ledCodeArray(), or 75 byte buffers
+    # as for ledBlit(); durations: ms for all frames or one per frame
+    from animation import Animation, pack_codes
+    return Animation([pack_codes(f, _colorCodes, _ledScreen) if len(f) == 25 else f for f in frames],
+                     durations, loop)
+
+def playAnimation(animation, loop=None, timer=True):
+    global _animation, _animationPos, _animationLoop, _animationTask
+    stopAnimation()
+    scrollTextStop()
+    stopChart()
+    _animation = animation
+    _animationPos = 0
+    _animationLoop = animation.loop if loop is None else loop
+    if timer:
+        _animationTask = _timerAdd(_animationStep, animationTick())
+
+def _animationStep():
+    wait = animationTick()
+    if wait:
+        _timerPeriod(_animationTask, wait)
+
+def animationTick():
+    # shows the next frame, returns ms until the following one or 0 when done
+    global _animationPos
+    if _animation is None:
+        return 0
+    if _animationPos >= len(_animation):
+        if not _animationLoop:
+            stopAnimation()
+            return 0
+        _animationPos = 0
+    _ledBack[:] = _animation.frame(_animationPos)
+    _ledFlush()  # no write when the frame looks like the last one shown
+    _animationPos += 1
+    return _animation.durations[_animationPos - 1]
+
+def stopAnimation():
+    # the last frame shown stays on the display
+    global _animation, _animationTask
+    _animation = None
+    if _animationTask:
+        _timerRemove(_animationTask)
+        _animationTask = None
+
+def animationPlaying():
+    return _animation is not None
+
+# live charts, see chart.py: every tick reads the sources once, the chart
+# scrolls one column left and the newest value is the right column
+def _accelMilliG():
+    # magnitude of the acceleration in milli-g, about 1000 at rest
+    if _imu():
+        sampleIMU(False)
+        x, y, z = _imuAccel
+        return int(math.sqrt(x * x + y * y + z * z) * (1000 / 9.80665))
+    else:
+        return None
+
+_chartSources = {'light':(lightLevel, 1), 'lightL':(lightLevelL, 1), 'lightR':(lightLevelR, 1),
+                 'temperature':(temperatureCenti, 1), 'acceleration':(_accelMilliG, 1)}
+_chartModes = {'sparkline':0, 'histogram':1}
+_chart = None
+_chartReads = ()
+_chartColors = b''
+_chartMasks = b''
+_chartTask = None
+
+def startChart(sources='light', rate=10, mode='sparkline', low=None, high=None, codes='WRGB', timer=True):
+    # sources: a name of _chartSources or a function returning a number, or
+    # a tuple of them drawn in order with one color code each; low/high in
+    # the units of the source (centi-degrees, milli-g), None autoscales
+    global _chart, _chartReads, _chartColors, _chartMasks, _chartTask
+    from chart import Chart
+    stopChart()
+    scrollTextStop()
+    stopAnimation()
+    if type(sources) is not tuple:
+        sources = (sources,)
+    _chartReads = tuple(_chartSources[source] if type(source) is str else (source, 1) for source in sources)
+    _chartColors = tuple(_colorCodes[codes[i % len(codes)]] for i in range(len(sources)))
+    _chart = Chart(len(sources), _chartModes[mode], low, high)
+    _chartMasks = bytearray(len(sources) * 5)
+    if timer:
+        _chartTask = _timerAdd(chartTick, 1000 / rate)
+
+def chartTick():
+    for i in range(len(_chartReads)):
+        read, scale = _chartReads[i]
+        value = read()
+        _chart.add(i, 0 if value is None else value * scale)
+    _chartDraw()
+
+def chartAdd(*values):
+    # feed the chart yourself, one value per series, after startChart(timer=False)
+    for i in range(len(values)):
+        _chart.add(i, values[i])
+    _chartDraw()
+
+def _chartDraw():
+    # later series are drawn over earlier ones
+    _chart.advance()
+    _chart.render(_chartMasks)
+    black = _colorCodes['*']
+    series = len(_chartColors)
+    for col in range(5):
+        pixel = (4 - col) * 5
+        for row in range(5):
+            color = black
+            for s in range(series):
+                if _chartMasks[s * 5 + col] >> row & 1:
+                    color = _chartColors[s]
+            _ledSet(pixel + row, color)
+    _ledFlush()
+
+def stopChart():
+    global _chart, _chartTask
+    _chart = None
+    if _chartTask:
+        _timerRemove(_chartTask)
+        _chartTask = None
+
+def chartRunning():
+    return _chart is not None
+
+def chartRange():
+    # (low, high) the chart currently spans, None when no chart runs
+    return (_chart.low, _chart.high) if _chart else None
+
+# opt-in instrumentation, see instrument.py; while enabled every public
+# function, the shared timer, the IMU I2C bus and the LED strip are timed,
+# while disabled the originals are back in place and nothing is measured
+_statsOriginals = {}
+
+def enableStats(enabled=True):
+    global _stats
+    names = globals()
+    if enabled and _stats is None:
+        from instrument import Instrument
+        _stats = Instrument()
+        for name, value in tuple(names.items()):
+            if type(value) is type(enableStats) and (name[0] != '_' or name == '_timerRun') \
+                    and not name.endswith('Async') and name not in ('enableStats', 'stats', 'resetStats'):
+                _statsOriginals[name] = value
+                names[name] = _stats.wrap('timer' if name == '_timerRun' else name, value)
+        _statsBuses(True)
+    elif not enabled and _stats is not None:
+        _stats.enabled = False  # wrappers still referenced somewhere call through
+        _statsBuses(False)
+        wrappers = {names[name]: value for name, value in _statsOriginals.items()}
+        for task in _timerTasks:
+            task[0] = wrappers.get(task[0], task[0])
+        for i in range(len(_imuHandlers)):
+            _imuHandlers[i] = wrappers.get(_imuHandlers[i], _imuHandlers[i])
+        names.update(_statsOriginals)
+        _statsOriginals.clear()
+        _stats = None
+
+def _statsBuses(wrap):
+    global _neoPixel
+    if _neoPixel is not None:
+        _neoPixel = _stats.neopixel(_neoPixel) if wrap else _neoPixel.target
+    if _mpu9250:
+        i2c = _mpu9250.mpu6500.i2c
+        i2c = _stats.i2c(i2c) if wrap else i2c.target
+        _mpu9250.mpu6500.i2c = i2c
+        _mpu9250.ak8963.i2c = i2c
+
+def stats(show=False):
+    # {name: (calls, total us, max us, log2 us buckets)} plus 'i2c_bytes'
+    if _stats is None:
+        return {}
+    if show:
+        _stats.report()
+    return _stats.stats()
+
+def resetStats():
+    if _stats is not None:
+        _stats.reset()
+
+# uasyncio companions of the blocking functions, uasyncio is only
+# imported when one of them is first awaited
+
+async def pauseAsync(delay):
+    import uasyncio
+    await uasyncio.sleep_ms(round(delay))
+
+async def analogPitchAsync(freq, delay):
+    delay = round(delay)
+    buzzer = _pitchOn(freq)
+    if delay > 0:
+        if delay > 10:
+            await pauseAsync(delay - 10)
+            buzzer.duty(0)
+            await pauseAsync(10)
+        else:
+            await pauseAsync(delay)
+            buzzer.duty(0)
+
+async def playToneAsync(note, delay=0):
+    await analogPitchAsync(freq=_noteFreqs[_noteIndex(note)], delay=delay)
+
+async def restAsync(delay=0):
+    await playToneAsync(note='*', delay=delay)
+
+async def scrollTextAsync(text, delay=150, code='W'):
+    color = _colorCodes[code]
+    screen = bytearray(5)
+    for column in _textColumns(text):
+        _scrollStep(screen, column, color)
+        await pauseAsync(delay)
+
+async def playAnimationAsync(animation, loop=None):
+    # plays from the calling task instead of the timer, returns when done
+    import uasyncio
+    playAnimation(animation, loop, timer=False)
+    due = utime.ticks_ms()
+    wait = animationTick()
+    while wait:
+        due = utime.ticks_add(due, wait)
+        await uasyncio.sleep_ms(max(0, utime.ticks_diff(due, utime.ticks_ms())))
+        if _animation is not animation:
+            return  # stopped or replaced meanwhile
+        wait = animationTick()
+
+async def calibrateCompassAsync(count=150, delay=100):
+    if _imu():
+        ak8963 = _mpu9250.ak8963
+        ak8963.calibrate_begin()
+        for _ in range(count):
+            await pauseAsync(delay)
+            ak8963.calibrate_step()
+        result = ak8963.calibrate_end()
+        if result is not None:
+            _calSave()
+        return result
+    else:
+        return None
+
+async def onButtonPressedAsync(button, poll=20):
+    while not onButtonPressed(button):
+        await pauseAsync(poll)
+
+async def buttonEventAsync():
+    # waits for the next button event, startButtonEvents() must have run
+    import uasyncio
+    if _buttons.flag is None:
+        _buttons.flag = uasyncio.ThreadSafeFlag()
+    while True:
+        event = _buttons.get()
+        if event:
+            return _buttonEvent(event)
+        await _buttons.flag.wait()
+
+class _SensorStream:
+    # async iterator calling read() every period ms without drifting
+    def __init__(self, read, period):
+        self._read = read
+        self._period = period
+        self._due = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        import uasyncio
+        now = utime.ticks_ms()
+        if self._due is None:
+            self._due = now
+        else:
+            self._due = utime.ticks_add(self._due, self._period)
+            wait = utime.ticks_diff(self._due, now)
+            if wait < 0:
+                self._due = now  # fell behind, do not burst to catch up
+            await uasyncio.sleep_ms(max(0, wait))
+        return self._read()
 
-noTone()
-ledOff()
+def sensorStream(read, period=100):
+    return _SensorStream(read, period)
@@ -0,0 +1,100 @@
+# MicroPython ESP32 fixed rate ADC acquisition for BPI:bit/Web:bit
+
+"""
+Fixed rate acquisition of one or more ADC channels with oversampling,
+decimation and an optional moving average or median filter. Filtered values
+land in preallocated array('H') ring buffers, one per channel.
+"""
+
+# pylint: disable=import-error
+from array import array
+from micropython import const
+# pylint: enable=import-error
+
+FILTER_NONE = const(0)
+FILTER_AVERAGE = const(1)
+FILTER_MEDIAN = const(2)
+
+def _zeros(typecode, size):
+    return array(typecode, (0 for _ in range(size)))
+
+class ADCSampler:
+    """
+    Call `sample()` at a fixed rate, for example from a timer. Each call
+    reads every channel `oversample` times, averages the reads into one
+    value and passes it through the filter over the last `window` values.
+    """
+    def __init__(
+        self, adcs, size=64, oversample=4,
+        filter=FILTER_AVERAGE, window=4
+    ):
+        self._adcs = tuple(adcs)
+        channels = len(self._adcs)
+        self._size = size
+        self._oversample = max(1, oversample)
+        self._filter = filter
+        self._window_size = max(1, window)
+        self._buffers = tuple(_zeros("H", size) for _ in range(channels))
+        self._windows = tuple(_zeros("H", self._window_size) for _ in range(channels))
+        self._sums = _zeros("L", channels)
+        self._latest = _zeros("H", channels)
+        self._scratch = _zeros("H", self._window_size)
+        self._window_pos = 0
+        self._window_fill = 0 # values in the windows, up to window
+        self.head = 0
+        self.count = 0 # valid values in the ring buffers
+
+    def sample(self):
+        """ Acquire one filtered value per channel. """
+        oversample = self._oversample
+        pos = self._window_pos
+        filled = min(self._window_fill + 1, self._window_size)
+
+        for channel in range(len(self._adcs)):
+            adc = self._adcs[channel]
+            total = 0
+            for _ in range(oversample):
+                total += adc.read()
+            value = total // oversample
+
+            if self._filter == FILTER_AVERAGE:
+                window = self._windows[channel]
+                self._sums[channel] += value - window[pos]
+                window[pos] = value
+                value = self._sums[channel] // filled
+            elif self._filter == FILTER_MEDIAN:
+                self._windows[channel][pos] = value
+                value = self._median(self._windows[channel], filled)
+
+            self._buffers[channel][self.head] = value
+            self._latest[channel] = value
+
+        self._window_pos = (pos + 1) % self._window_size
+        self._window_fill = filled
+        self.head = (self.head + 1) % self._size
+        if self.count < self._size:
+            self.count += 1
+
+    def _median(self, window, filled):
+        # insertion sort into preallocated scratch, no allocation
+        scratch = self._scratch
+        for i in range(filled):
+            value = window[i]
+            j = i
+            while j and scratch[j - 1] > value:
+                scratch[j] = scratch[j - 1]
+                j -= 1
+            scratch[j] = value
+        return scratch[filled // 2]
+
+    def latest(self, channel):
+        """ Most recent filtered value of `channel` (0 to 4095). """
+        return self._latest[channel]
+
+    def buffer(self, channel):
+        """
+        The ring buffer of `channel` itself, no copy. `head` is the index the
+        next value will be written to, ie. the oldest value once the buffer
+        has wrapped.
+        """
+        return self._buffers[channel]
@@ -0,0 +1,220 @@
+# MicroPython ESP32 orientation sensor fusion for BPI:bit/Web:bit
+# Madgwick, "An efficient orientation filter for inertial and
+# inertial/magnetic sensor arrays", 2010
+
+"""
+Incremental Madgwick AHRS filter. Feed it accelerometer, gyro (rad/s) and
+optionally magnetometer samples, all in the same right handed body frame,
+and read back the orientation as a quaternion or as roll, pitch and yaw.
+"""
+
+# pylint: disable=import-error
+import math
+import micropython
+from array import array
+# pylint: enable=import-error
+
+_RAD_TO_DEG = 57.29577951308232
+
+class AHRS:
+    """
+    Quaternion state lives in a preallocated array('f'), updates create no
+    containers. The first `warmup` updates use a high gain so the estimate
+    converges from the initial identity orientation within a second or so.
+    """
+    def __init__(self, beta=0.1, warmup=100):
+        self.beta = beta
+        self._warmup = warmup
+        self.q = array("f", (1.0, 0.0, 0.0, 0.0))
+        self.reset()
+
+    def reset(self):
+        """ Back to identity orientation and a new warm-up. """
+        q = self.q
+        q[0] = 1.0
+        q[1] = q[2] = q[3] = 0.0
+        self._remaining = self._warmup
+
+    def _gain(self):
+        if self._remaining:
+            self._remaining -= 1
+            return 2.5
+        return self.beta
+
+    @micropython.native
+    def update(self, ax, ay, az, gx, gy, gz, mx, my, mz, dt):
+        """
+        One filter step with accelerometer, gyro in rad/s and magnetometer
+        readings, `dt` seconds after the previous one. Falls back to
+        `update_imu()` while the magnetometer reads all zero.
+        """
+        if mx == 0.0 and my == 0.0 and mz == 0.0:
+            self.update_imu(ax, ay, az, gx, gy, gz, dt)
+            return
+
+        q = self.q
+        q0 = q[0]
+        q1 = q[1]
+        q2 = q[2]
+        q3 = q[3]
+
+        # Rate of change of quaternion from gyroscope
+        qd0 = 0.5 * (-q1 * gx - q2 * gy - q3 * gz)
+        qd1 = 0.5 * (q0 * gx + q2 * gz - q3 * gy)
+        qd2 = 0.5 * (q0 * gy - q1 * gz + q3 * gx)
+        qd3 = 0.5 * (q0 * gz + q1 * gy - q2 * gx)
+
+        norm = ax * ax + ay * ay + az * az
+        if norm > 0.0:
+            norm = 1.0 / math.sqrt(norm)
+            ax *= norm
+            ay *= norm
+            az *= norm
+            norm = 1.0 / math.sqrt(mx * mx + my * my + mz * mz)
+            mx *= norm
+            my *= norm
+            mz *= norm
+
+            _2q0mx = 2.0 * q0 * mx
+            _2q0my = 2.0 * q0 * my
+            _2q0mz = 2.0 * q0 * mz
+            _2q1mx = 2.0 * q1 * mx
+            _2q0 = 2.0 * q0
+            _2q1 = 2.0 * q1
+            _2q2 = 2.0 * q2
+            _2q3 = 2.0 * q3
+            _2q0q2 = 2.0 * q0 * q2
+            _2q2q3 = 2.0 * q2 * q3
+            q0q0 = q0 * q0
+            q0q1 = q0 * q1
+            q0q2 = q0 * q2
+            q0q3 = q0 * q3
+            q1q1 = q1 * q1
+            q1q2 = q1 * q2
+            q1q3 = q1 * q3
+            q2q2 = q2 * q2
+            q2q3 = q2 * q3
+            q3q3 = q3 * q3
+
+            # Reference direction of Earth's magnetic field
+            hx = (mx * q0q0 - _2q0my * q3 + _2q0mz * q2 + mx * q1q1
+                  + _2q1 * my * q2 + _2q1 * mz * q3 - mx * q2q2 - mx * q3q3)
+            hy = (_2q0mx * q3 + my * q0q0 - _2q0mz * q1 + _2q1mx * q2
+                  - my * q1q1 + my * q2q2 + _2q2 * mz * q3 - my * q3q3)
+            _2bx = math.sqrt(hx * hx + hy * hy)
+            _2bz = (-_2q0mx * q2 + _2q0my * q1 + mz * q0q0 + _2q1mx * q3
+                    - mz * q1q1 + _2q2 * my * q3 - mz * q2q2 + mz * q3q3)
+            _4bx = 2.0 * _2bx
+            _4bz = 2.0 * _2bz
+
+            # Objective function errors shared by the gradient terms
+            ex = 2.0 * q1q3 - _2q0q2 - ax
+            ey = 2.0 * q0q1 + _2q2q3 - ay
+            ez = 1.0 - 2.0 * q1q1 - 2.0 * q2q2 - az
+            fx = _2bx * (0.5 - q2q2 - q3q3) + _2bz * (q1q3 - q0q2) - mx
+            fy = _2bx * (q1q2 - q0q3) + _2bz * (q0q1 + q2q3) - my
+            fz = _2bx * (q0q2 + q1q3) + _2bz * (0.5 - q1q1 - q2q2) - mz
+
+            # Gradient descent corrective step
+            s0 = (-_2q2 * ex + _2q1 * ey - _2bz * q2 * fx
+                  + (-_2bx * q3 + _2bz * q1) * fy + _2bx * q2 * fz)
+            s1 = (_2q3 * ex + _2q0 * ey - 4.0 * q1 * ez + _2bz * q3 * fx
+                  + (_2bx * q2 + _2bz * q0) * fy + (_2bx * q3 - _4bz * q1) * fz)
+            s2 = (-_2q0 * ex + _2q3 * ey - 4.0 * q2 * ez
+                  + (-_4bx * q2 - _2bz * q0) * fx + (_2bx * q1 + _2bz * q3) * fy
+                  + (_2bx * q0 - _4bz * q2) * fz)
+            s3 = (_2q1 * ex + _2q2 * ey + (-_4bx * q3 + _2bz * q1) * fx
+                  + (-_2bx * q0 + _2bz * q2) * fy + _2bx * q1 * fz)
+
+            norm = s0 * s0 + s1 * s1 + s2 * s2 + s3 * s3
+            if norm > 0.0:
+                norm = self._gain() / math.sqrt(norm)
+                qd0 -= norm * s0
+                qd1 -= norm * s1
+                qd2 -= norm * s2
+                qd3 -= norm * s3
+
+        self._integrate(q0 + qd0 * dt, q1 + qd1 * dt, q2 + qd2 * dt, q3 + qd3 * dt)
+
+    @micropython.native
+    def update_imu(self, ax, ay, az, gx, gy, gz, dt):
+        """ One filter step without magnetometer, yaw will drift. """
+        q = self.q
+        q0 = q[0]
+        q1 = q[1]
+        q2 = q[2]
+        q3 = q[3]
+
+        qd0 = 0.5 * (-q1 * gx - q2 * gy - q3 * gz)
+        qd1 = 0.5 * (q0 * gx + q2 * gz - q3 * gy)
+        qd2 = 0.5 * (q0 * gy - q1 * gz + q3 * gx)
+        qd3 = 0.5 * (q0 * gz + q1 * gy - q2 * gx)
+
+        norm = ax * ax + ay * ay + az * az
+        if norm > 0.0:
+            norm = 1.0 / math.sqrt(norm)
+            ax *= norm
+            ay *= norm
+            az *= norm
+
+            _2q0 = 2.0 * q0
+            _2q1 = 2.0 * q1
+            _2q2 = 2.0 * q2
+            _2q3 = 2.0 * q3
+            _4q0 = 4.0 * q0
+            _4q1 = 4.0 * q1
+            _4q2 = 4.0 * q2
+            _8q1 = 8.0 * q1
+            _8q2 = 8.0 * q2
+            q0q0 = q0 * q0
+            q1q1 = q1 * q1
+            q2q2 = q2 * q2
+            q3q3 = q3 * q3
+
+            s0 = _4q0 * q2q2 + _2q2 * ax + _4q0 * q1q1 - _2q1 * ay
+            s1 = (_4q1 * q3q3 - _2q3 * ax + 4.0 * q0q0 * q1 - _2q0 * ay - _4q1
+                  + _8q1 * q1q1 + _8q1 * q2q2 + _4q1 * az)
+            s2 = (4.0 * q0q0 * q2 + _2q0 * ax + _4q2 * q3q3 - _2q3 * ay - _4q2
+                  + _8q2 * q1q1 + _8q2 * q2q2 + _4q2 * az)
+            s3 = 4.0 * q1q1 * q3 - _2q1 * ax + 4.0 * q2q2 * q3 - _2q2 * ay
+
+            norm = s0 * s0 + s1 * s1 + s2 * s2 + s3 * s3
+            if norm > 0.0:
+                norm = self._gain() / math.sqrt(norm)
+                qd0 -= norm * s0
+                qd1 -= norm * s1
+                qd2 -= norm * s2
+                qd3 -= norm * s3
+
+        self._integrate(q0 + qd0 * dt, q1 + qd1 * dt, q2 + qd2 * dt, q3 + qd3 * dt)
+
+    def _integrate(self, q0, q1, q2, q3):
+        norm = 1.0 / math.sqrt(q0 * q0 + q1 * q1 + q2 * q2 + q3 * q3)
+        q = self.q
+        q[0] = q0 * norm
+        q[1] = q1 * norm
+        q[2] = q2 * norm
+        q[3] = q3 * norm
+
+    @property
+    def roll(self):
+        """ Rotation around the X axis in degrees. """
+        q = self.q
+        return _RAD_TO_DEG * math.atan2(
+            2.0 * (q[0] * q[1] + q[2] * q[3]),
+            1.0 - 2.0 * (q[1] * q[1] + q[2] * q[2]))
+
+    @property
+    def pitch(self):
+        """ Rotation around the Y axis in degrees. """
+        q = self.q
+        value = 2.0 * (q[0] * q[2] - q[3] * q[1])
+        return _RAD_TO_DEG * math.asin(min(1.0, max(-1.0, value)))
+
+    @property
+    def yaw(self):
+        """ Rotation around the Z axis in degrees. """
+        q = self.q
+        return _RAD_TO_DEG * math.atan2(
+            2.0 * (q[0] * q[3] + q[1] * q[2]),
+            1.0 - 2.0 * (q[2] * q[2] + q[3] * q[3]))
@@ -72,6 +72,7 @@ class AK8963:
         self.address = address
         self._offset = offset
         self._scale = scale
+        self._burst = bytearray(7)
 
         if 0x48 != self.whoami:
             raise RuntimeError("AK8963 not found in I2C bus.")
@@ -103,8 +104,22 @@ class AK8963:
         """
         X, Y, Z axis micro-Tesla (uT) as floats.
         """
-        xyz = list(self._register_three_shorts(_HXL))
-        self._register_char(_ST2) # Enable updating readings again
+        xyz = self._magnetic_uncalibrated()
+
+        # Apply hard iron ie. offset bias from calibration
+        xyz[0] -= self._offset[0]
+        xyz[1] -= self._offset[1]
+        xyz[2] -= self._offset[2]
+
+        # Apply soft iron ie. scale bias from calibration
+        xyz[0] *= self._scale[0]
+        xyz[1] *= self._scale[1]
+        xyz[2] *= self._scale[2]
+
+        return tuple(xyz)
+
+    def _magnetic_uncalibrated(self):
+        xyz = list(self.magnetic_raw())
 
         # Apply factory axial sensitivy adjustements
         xyz[0] *= self._adjustement[0]
@@ -117,47 +132,95 @@ class AK8963:
         xyz[1] *= so
         xyz[2] *= so
 
-        # Apply hard iron ie. offset bias from calibration
-        xyz[0] -= self._offset[0]
-        xyz[1] -= self._offset[1]
-        xyz[2] -= self._offset[2]
+        return xyz
 
-        # Apply soft iron ie. scale bias from calibration
-        xyz[0] *= self._scale[0]
-        xyz[1] *= self._scale[1]
-        xyz[2] *= self._scale[2]
+    def magnetic_raw(self):
+        """
+        Raw signed X, Y, Z counts. HXL to ST2 is read as one 7 byte burst,
+        reading ST2 as part of it enables updating readings again.
+        """
+        self.i2c.readfrom_mem_into(self.address, _HXL, self._burst)
+        return ustruct.unpack_from("<hhh", self._burst)
 
-        return tuple(xyz)
+    def magnetic_raw_into(self, out):
+        """
+        Like `magnetic_raw()` but unpacks into `out`, an array('h') of at
+        least 3 items, without allocating.
+        """
+        self.i2c.readfrom_mem_into(self.address, _HXL, self._burst)
+        burst = self._burst
+        for i in range(3):
+            value = burst[2 * i + 1] << 8 | burst[2 * i]
+            out[i] = value - 0x10000 if value & 0x8000 else value
 
     @property
     def adjustement(self):
         return self._adjustement
 
+    @property
+    def offset(self):
+        """ Hard iron offset in uT. """
+        return self._offset
+
+    @property
+    def scale(self):
+        """ Soft iron scale per axis. """
+        return self._scale
+
+    def set_calibration(self, offset=(0, 0, 0), scale=(1, 1, 1)):
+        """ Apply a hard iron offset and soft iron scale, eg. saved earlier. """
+        self._offset = tuple(offset)
+        self._scale = tuple(scale)
+
     @property
     def whoami(self):
         """ Value of the whoami register. """
         return self._register_char(_WIA)
 
     def calibrate(self, count=256, delay=200):
-        self._offset = (0, 0, 0)
-        self._scale = (1, 1, 1)
-
-        reading = self.magnetic
-        minx = maxx = reading[0]
-        miny = maxy = reading[1]
-        minz = maxz = reading[2]
+        self.calibrate_begin()
 
         while count:
             utime.sleep_ms(delay)
-            reading = self.magnetic
-            minx = min(minx, reading[0])
-            maxx = max(maxx, reading[0])
-            miny = min(miny, reading[1])
-            maxy = max(maxy, reading[1])
-            minz = min(minz, reading[2])
-            maxz = max(maxz, reading[2])
+            self.calibrate_step()
             count -= 1
 
+        return self.calibrate_end()
+
+    def calibrate_begin(self):
+        """
+        Start an incremental calibration. Call `calibrate_step()` while the
+        device is being turned around and `calibrate_end()` when done. The
+        current calibration stays applied to readings until then.
+        """
+        reading = self._magnetic_uncalibrated()
+        self._cal_min = list(reading)
+        self._cal_max = list(reading)
+
+    def calibrate_step(self):
+        """ Take one uncalibrated reading and track the min/max of each axis. """
+        reading = self._magnetic_uncalibrated()
+        for i in range(3):
+            self._cal_min[i] = min(self._cal_min[i], reading[i])
+            self._cal_max[i] = max(self._cal_max[i], reading[i])
+        return reading
+
+    def calibrate_end(self):
+        """
+        Apply and return offset and scale from the tracked min/max. Returns
+        None and keeps the current calibration when an axis never changed,
+        ie. the device was not turned around every axis.
+        """
+        minx, miny, minz = self._cal_min
+        maxx, maxy, maxz = self._cal_max
+
+        avg_delta_x = (maxx - minx) / 2
+        avg_delta_y = (maxy - miny) / 2
+        avg_delta_z = (maxz - minz) / 2
+
+        if not (avg_delta_x and avg_delta_y and avg_delta_z):
+            return None
+
         # Hard iron correction
         offset_x = (maxx + minx) / 2
         offset_y = (maxy + miny) / 2
@@ -166,10 +229,6 @@ class AK8963:
         self._offset = (offset_x, offset_y, offset_z)
 
         # Soft iron correction
-        avg_delta_x = (maxx - minx) / 2
-        avg_delta_y = (maxy - miny) / 2
-        avg_delta_z = (maxz - minz) / 2
-
         avg_delta = (avg_delta_x + avg_delta_y + avg_delta_z) / 3
 
         scale_x = avg_delta / avg_delta_x
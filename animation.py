@@ -0,0 +1,67 @@
+# MicroPython ESP32 precompiled LED animations for BPI:bit/Web:bit
+
+"""
+Compiles a sequence of 5x5 frames once into one bytes object already in
+NeoPixel order (75 GRB bytes per frame) with a duration per frame, so
+playing a frame is a single copy into the display buffer. Consecutive
+identical frames are merged into one longer frame at compile time.
+"""
+
+# pylint: disable=import-error
+from array import array
+from micropython import const
+# pylint: enable=import-error
+
+FRAME = const(75) # bytes per frame, 25 pixels GRB
+
+def pack_codes(codes, colors, order):
+    """
+    One frame from 25 color codes as for ledCodeArray(). `colors` maps a
+    code to a packed 0xRRGGBB color, pixel n shows codes[order[n]].
+    """
+    frame = bytearray(FRAME)
+    for pixel in range(25):
+        color = colors[codes[order[pixel]]]
+        i = pixel * 3
+        frame[i] = color >> 8 & 0xFF
+        frame[i + 1] = color >> 16
+        frame[i + 2] = color & 0xFF
+    return frame
+
+class Animation:
+    """
+    `frames` are 75 byte buffers in NeoPixel order, `durations` one ms
+    value for all frames or one per frame (up to 65535 each). `loop` is the
+    default of the player. `frame(i)` is a memoryview made once here, so
+    showing a frame allocates nothing.
+    """
+    def __init__(self, frames, durations=100, loop=True):
+        if type(durations) is int:
+            durations = [durations] * len(frames)
+        if len(durations) != len(frames) or not frames:
+            raise ValueError("one duration per frame")
+        data = bytearray()
+        times = array("H")
+        for i in range(len(frames)):
+            if len(frames[i]) != FRAME:
+                raise ValueError("frames are 75 bytes")
+            if times and data[-FRAME:] == frames[i]:
+                times[-1] = min(0xFFFF, times[-1] + durations[i])
+                continue
+            data.extend(frames[i])
+            times.append(min(0xFFFF, max(1, durations[i])))
+        self.data = bytes(data)
+        self.durations = times
+        self.loop = loop
+        view = memoryview(self.data)
+        self._frames = tuple(view[i * FRAME:(i + 1) * FRAME] for i in range(len(times)))
+
+    def __len__(self):
+        return len(self.durations)
+
+    def frame(self, i):
+        return self._frames[i]
+
+    def length(self):
+        """ Total play time of one pass in ms. """
+        return sum(self.durations)
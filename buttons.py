@@ -0,0 +1,158 @@
+# MicroPython ESP32 interrupt driven button events for BPI:bit/Web:bit
+
+"""
+Debounced press, release, click, double click, long press and A+B chord
+events from pin interrupts, queued with their ticks_ms time stamps in
+preallocated buffers. The interrupt handlers only write the queue and the
+reader only advances its own index, so reading never races with them.
+"""
+
+# pylint: disable=import-error
+import utime
+from array import array
+from machine import Pin
+from micropython import const
+# pylint: enable=import-error
+
+A = const(1)
+B = const(2)
+AB = const(3)
+
+PRESS = const(1)
+RELEASE = const(2)
+CLICK = const(3)
+DOUBLE_CLICK = const(4)
+LONG_PRESS = const(5)
+CHORD = const(6)
+
+BUTTONS = ("", "A", "B", "AB")
+EVENTS = ("", "press", "release", "click", "double click", "long press", "chord")
+
+class ButtonEvents:
+    """
+    `pins` are the machine.Pin of A and B, low while pressed. Edges closer
+    than `debounce` ms to the last accepted one are bounce. A release within
+    `double` ms of a click makes a double click instead of a second click,
+    holding for `long` ms makes a long press. Pressing both makes a chord
+    and no click or long press for either. `poll()` must run every few tens
+    of ms while `held` is true, for long presses and missed releases.
+    `on_held(held)` is called when that changes, `flag` (eg. a
+    uasyncio.ThreadSafeFlag) is set on every event. Up to `size` - 1
+    unread events are queued, newer ones are counted in `dropped`.
+    """
+    def __init__(self, pins, debounce=20, double=300, long=800, size=32, on_held=None):
+        self._pins = pins
+        self._debounce = debounce
+        self._double = double
+        self._long = long
+        self._on_held = on_held
+        self.flag = None
+
+        self._pressed = bytearray(2)
+        self._edge = array("L", (0, 0))
+        self._down = array("L", (0, 0))
+        self._clicked = array("L", (0, 0)) # time of the last click
+        self._armed = bytearray(2) # a click within `double` ms may double
+        self._spent = bytearray(2) # long press or chord already reported
+        self.held = False
+
+        self._codes = bytearray(size)
+        self._times = array("L", (0 for _ in range(size)))
+        self._head = 0 # next to read, only get() moves it
+        self._tail = 0 # next to write, only _push() moves it
+        self.dropped = 0
+
+        self._handlers = (self._irq_a, self._irq_b)
+
+    def start(self):
+        now = utime.ticks_ms()
+        for i in range(2):
+            self._pressed[i] = 1 if self._pins[i].value() == 0 else 0
+            self._edge[i] = utime.ticks_add(now, -self._debounce)
+            self._pins[i].irq(handler=self._handlers[i], trigger=Pin.IRQ_FALLING | Pin.IRQ_RISING)
+        self._hold()
+
+    def stop(self):
+        for pin in self._pins:
+            pin.irq(handler=None)
+
+    def _irq_a(self, pin):
+        self._level(0, pin.value() == 0, utime.ticks_ms())
+
+    def _irq_b(self, pin):
+        self._level(1, pin.value() == 0, utime.ticks_ms())
+
+    def _level(self, i, pressed, now):
+        # debounce: same state or too soon after the last accepted edge
+        if pressed == self._pressed[i] or utime.ticks_diff(now, self._edge[i]) < self._debounce:
+            return
+        self._edge[i] = now
+        self._pressed[i] = pressed
+        button = i + 1
+        other = 1 - i
+        if pressed:
+            self._down[i] = now
+            self._spent[i] = 0
+            self._push(button, PRESS, now)
+            if self._pressed[other] and not self._spent[other]:
+                self._spent[i] = self._spent[other] = 1
+                self._push(AB, CHORD, now)
+        else:
+            self._push(button, RELEASE, now)
+            if not self._spent[i]:
+                if self._armed[i] and utime.ticks_diff(now, self._clicked[i]) < self._double:
+                    self._armed[i] = 0
+                    self._push(button, DOUBLE_CLICK, now)
+                else:
+                    self._armed[i] = 1
+                    self._clicked[i] = now
+                    self._push(button, CLICK, now)
+        self._hold()
+
+    def _hold(self):
+        held = bool(self._pressed[0] or self._pressed[1])
+        if held != self.held:
+            self.held = held
+            if self._on_held:
+                self._on_held(held)
+
+    def poll(self):
+        """ Long presses, and releases whose interrupt was missed. """
+        now = utime.ticks_ms()
+        for i in range(2):
+            if self._pressed[i]:
+                if self._pins[i].value() and utime.ticks_diff(now, self._edge[i]) >= self._debounce:
+                    self._level(i, False, now)
+                elif not self._spent[i] and utime.ticks_diff(now, self._down[i]) >= self._long:
+                    self._spent[i] = 1
+                    self._armed[i] = 0
+                    self._push(i + 1, LONG_PRESS, now)
+
+    def _push(self, button, event, now):
+        tail = self._tail
+        following = (tail + 1) % len(self._codes)
+        if following == self._head:
+            self.dropped += 1
+            return
+        self._codes[tail] = button << 4 | event
+        self._times[tail] = now
+        self._tail = following
+        if self.flag:
+            self.flag.set()
+
+    def any(self):
+        """ Number of unread events. """
+        return (self._tail - self._head) % len(self._codes)
+
+    def get(self):
+        """ The oldest unread event as (button, event, ticks_ms), or None. """
+        head = self._head
+        if head == self._tail:
+            return None
+        code = self._codes[head]
+        event = (code >> 4, code & 0x0F, self._times[head])
+        self._head = (head + 1) % len(self._codes)
+        return event
+
+    def clear(self):
+        self._head = self._tail
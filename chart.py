@@ -0,0 +1,115 @@
+# MicroPython ESP32 scrolling charts for the BPI:bit/Web:bit 5x5 display
+
+"""
+Keeps the last few values of one or more series in preallocated rings and
+renders them as column bitmasks for a scrolling sparkline or histogram.
+Values are mapped to rows with integer thresholds computed once for a fixed
+range, or again only when the autoscaled range changes.
+"""
+
+# pylint: disable=import-error
+from array import array
+from micropython import const
+# pylint: enable=import-error
+
+SPARKLINE = const(0)
+HISTOGRAM = const(1)
+
+_BOTTOM = const(-0x40000000) # below any value, the sparkline bottom row
+
+class Chart:
+    """
+    `series` rings of `width` values share one scale from `low` to `high`,
+    or the smallest and largest value kept when either is None. In a
+    sparkline each value lights one of `height` rows, in a histogram it
+    fills 0 to `height` rows from the bottom. Column 0 is the oldest value.
+    """
+    def __init__(self, series=1, mode=SPARKLINE, low=None, high=None, width=5, height=5):
+        self.series = series
+        self.mode = mode
+        self.width = width
+        self.height = height
+        self._values = array("l", (0 for _ in range(series * width)))
+        self._head = 0 # next column to overwrite
+        self.count = 0 # values kept per series, up to width
+        self.thresholds = array("l", (0 for _ in range(height)))
+        self.autoscale = low is None or high is None
+        self.low = 0
+        self.high = 0
+        if not self.autoscale:
+            self._scale(low, high)
+
+    def _scale(self, low, high):
+        # level of a value = number of thresholds <= value, a value at
+        # `low` is the bottom row of a sparkline and an empty histogram column
+        self.low = low
+        self.high = high
+        span = high - low
+        height = self.height
+        thresholds = self.thresholds
+        if self.mode == HISTOGRAM:
+            for k in range(height):
+                thresholds[k] = low + max(1, ((2 * k + 1) * span) // (2 * height))
+        else:
+            thresholds[0] = _BOTTOM
+            for k in range(1, height):
+                thresholds[k] = low + max(1, (k * span) // height)
+
+    def add(self, series, value):
+        """ Store the newest value of one series, call `advance()` after all. """
+        self._values[series * self.width + self._head] = int(value)
+
+    def advance(self):
+        """ Close the current column and rescale if autoscaling. """
+        self._head = (self._head + 1) % self.width
+        if self.count < self.width:
+            self.count += 1
+        if self.autoscale:
+            self._autoscale()
+
+    def _autoscale(self):
+        values = self._values
+        width = self.width
+        low = high = None
+        for s in range(self.series):
+            base = s * width
+            for i in range(self.count):
+                v = values[base + (self._head - 1 - i) % width]
+                if low is None or v < low:
+                    low = v
+                if high is None or v > high:
+                    high = v
+        if low != self.low or high != self.high:
+            self._scale(low, high)
+
+    def level(self, value):
+        """ Rows lit by `value` in a histogram, or 1 + its row in a sparkline. """
+        thresholds = self.thresholds
+        n = 0
+        for k in range(self.height):
+            if value >= thresholds[k]:
+                n += 1
+        return n
+
+    def render(self, out):
+        """
+        Fill `out`, a bytearray of series * width, with one bitmask per
+        column and series, bit 0 is the top row. Columns without a value yet
+        stay empty.
+        """
+        values = self._values
+        width = self.width
+        height = self.height
+        histogram = self.mode == HISTOGRAM
+        empty = width - self.count
+        for s in range(self.series):
+            base = s * width
+            for col in range(width):
+                bits = 0
+                if col >= empty:
+                    n = self.level(values[base + (self._head + col) % width])
+                    if histogram:
+                        bits = ((1 << n) - 1) << (height - n)
+                    elif n:
+                        bits = 1 << (height - n)
+                out[base + col] = bits
@@ -0,0 +1,163 @@
+# MicroPython ESP32 accelerometer gesture detection for BPI:bit/Web:bit
+
+"""
+Incremental gesture detector. Feed it one raw accelerometer sample at a time
+and it reports shake, freefall, 3g, 6g, tilt left/right and face up/down as
+events. Every step is integer math over preallocated buffers and costs the
+same no matter how long it runs.
+"""
+
+# pylint: disable=import-error
+from array import array
+from micropython import const
+# pylint: enable=import-error
+
+NONE = const(0)
+SHAKE = const(1)
+FREEFALL = const(2)
+G3 = const(3)
+G6 = const(4)
+LEFT = const(5)
+RIGHT = const(6)
+FACE_UP = const(7)
+FACE_DOWN = const(8)
+
+NAMES = ("", "shake", "freefall", "3g", "6g", "left", "right", "face up", "face down")
+
+_SHIFT = const(3) # drop 3 bits so squared magnitudes stay small ints
+
+class GestureDetector:
+    """
+    `one_g` is the raw count of 1 g at the accelerometer range in use. The
+    last `size` samples are kept in `ring`, an array('h') of X, Y, Z
+    triplets. Orientation changes must hold for `debounce` samples, every
+    threshold has a lower exit level than entry level so noise around it
+    does not repeat events. Up to `events` unread events are queued.
+    """
+    def __init__(self, one_g=4096, size=16, debounce=4, events=8):
+        g = one_g >> _SHIFT
+        self._freefall_in = (g * 4 // 10) ** 2
+        self._freefall_out = (g * 6 // 10) ** 2
+        self._g3_in = (3 * g) ** 2
+        self._g3_out = (g * 25 // 10) ** 2
+        self._g6_in = (6 * g) ** 2
+        self._g6_out = (5 * g) ** 2
+        self._face_in = g * 8 // 10
+        self._face_out = g * 7 // 10
+        self._tilt_in = g * 75 // 100
+        self._tilt_out = g * 6 // 10
+        self._jerk = g * 15 // 10 # summed change of all axes between samples
+        self._shake_in = 4 # jerks within the ring for a shake
+        self._debounce = debounce
+
+        self._size = size
+        self.ring = array("h", (0 for _ in range(3 * size)))
+        self._jerks = bytearray(size)
+        self._queue = bytearray(events)
+        self.reset()
+
+    def reset(self):
+        """ Forget the history, the state and the queued events. """
+        self.head = 0
+        self.count = 0
+        self._jerk_count = 0
+        self._flags = 0 # magnitude gestures in progress, bit per gesture
+        self.orientation = NONE
+        self._candidate = NONE
+        self._candidate_count = 0
+        self.seen = 0 # bit per gesture seen since cleared
+        self._queue_head = 0
+        self._queue_count = 0
+
+    def update(self, x, y, z):
+        """ One raw sample, returns the number of queued events. """
+        ring = self.ring
+        head = self.head
+        i = 3 * head
+        if self.count:
+            j = 3 * ((head - 1) % self._size)
+            jerk = abs(x - ring[j]) + abs(y - ring[j + 1]) + abs(z - ring[j + 2])
+        else:
+            jerk = 0
+        ring[i] = x
+        ring[i + 1] = y
+        ring[i + 2] = z
+        self.head = (head + 1) % self._size
+        if self.count < self._size:
+            self.count += 1
+
+        x >>= _SHIFT
+        y >>= _SHIFT
+        z >>= _SHIFT
+        force = x * x + y * y + z * z
+
+        # shake: jerks counted over the ring, ends once the ring is quiet
+        jerked = 1 if jerk >> _SHIFT > self._jerk else 0
+        self._jerk_count += jerked - self._jerks[head]
+        self._jerks[head] = jerked
+        self._edge(SHAKE, self._jerk_count >= self._shake_in, self._jerk_count == 0)
+
+        self._edge(FREEFALL, force < self._freefall_in, force > self._freefall_out)
+        self._edge(G3, force > self._g3_in, force < self._g3_out)
+        self._edge(G6, force > self._g6_in, force < self._g6_out)
+
+        # orientation: keep the current one until it is clearly left
+        current = self.orientation
+        if not (current == FACE_UP and z > self._face_out
+                or current == FACE_DOWN and z < -self._face_out
+                or current == LEFT and x < -self._tilt_out
+                or current == RIGHT and x > self._tilt_out):
+            if z > self._face_in:
+                current = FACE_UP
+            elif z < -self._face_in:
+                current = FACE_DOWN
+            elif x < -self._tilt_in:
+                current = LEFT
+            elif x > self._tilt_in:
+                current = RIGHT
+            else:
+                current = NONE
+        if current == self.orientation:
+            self._candidate_count = 0
+        elif current == self._candidate:
+            self._candidate_count += 1
+            if self._candidate_count >= self._debounce:
+                self.orientation = current
+                self._candidate_count = 0
+                if current:
+                    self._push(current)
+        else:
+            self._candidate = current
+            self._candidate_count = 1
+        return self._queue_count
+
+    def _edge(self, gesture, enter, leave):
+        bit = 1 << gesture
+        if self._flags & bit:
+            if leave:
+                self._flags &= ~bit
+        elif enter:
+            self._flags |= bit
+            self._push(gesture)
+
+    def _push(self, gesture):
+        self.seen |= 1 << gesture
+        size = len(self._queue)
+        if self._queue_count == size: # full, drop the oldest
+            self._queue_head = (self._queue_head + 1) % size
+            self._queue_count -= 1
+        self._queue[(self._queue_head + self._queue_count) % size] = gesture
+        self._queue_count += 1
+
+    def get(self):
+        """ The oldest unread event, or NONE. """
+        if not self._queue_count:
+            return NONE
+        gesture = self._queue[self._queue_head]
+        self._queue_head = (self._queue_head + 1) % len(self._queue)
+        self._queue_count -= 1
+        return gesture
+
+    def active(self, gesture):
+        """ True while `gesture` is in progress or the orientation. """
+        return gesture == self.orientation or bool(self._flags & 1 << gesture)
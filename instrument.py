@@ -0,0 +1,174 @@
+# MicroPython ESP32 opt-in instrumentation for BPI:bit/Web:bit
+
+"""
+Call counters and ticks_us latency histograms for functions and buses.
+Nothing here runs until something is wrapped: functions are swapped for
+timing wrappers and bus objects for timing proxies, and unwrapping puts the
+originals back, so a disabled build pays nothing.
+"""
+
+# pylint: disable=import-error
+import gc
+import utime
+from array import array
+from micropython import const
+# pylint: enable=import-error
+
+BUCKETS = const(20) # bucket n counts latencies of 2**n to 2**(n+1)-1 us
+
+class Histogram:
+    """ Count, total, maximum and log2 buckets of latencies in us. """
+    def __init__(self):
+        self.buckets = array("L", (0 for _ in range(BUCKETS)))
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        buckets = self.buckets
+        for i in range(BUCKETS):
+            buckets[i] = 0
+
+    def add(self, us):
+        self.count += 1
+        self.total += us
+        if us > self.max:
+            self.max = us
+        i = 0
+        while us > 1 and i < BUCKETS - 1:
+            us >>= 1
+            i += 1
+        self.buckets[i] += 1
+
+    def percentile(self, p):
+        """ Upper edge in us of the bucket holding the `p` percentile. """
+        rank = self.count * p / 100
+        seen = 0
+        for i in range(BUCKETS):
+            seen += self.buckets[i]
+            if seen >= rank and seen:
+                return min(self.max, (2 << i) - 1)
+        return 0
+
+class I2CProxy:
+    """ Stands in for an I2C bus and times every register transfer. """
+    def __init__(self, target, histogram, counters):
+        self.target = target
+        self._histogram = histogram
+        self._counters = counters
+
+    def _done(self, start, nbytes):
+        self._histogram.add(utime.ticks_diff(utime.ticks_us(), start))
+        self._counters["i2c_bytes"] += nbytes
+
+    def readfrom_mem_into(self, addr, memaddr, buf, *args):
+        start = utime.ticks_us()
+        self.target.readfrom_mem_into(addr, memaddr, buf, *args)
+        self._done(start, len(buf))
+
+    def readfrom_mem(self, addr, memaddr, nbytes, *args):
+        start = utime.ticks_us()
+        data = self.target.readfrom_mem(addr, memaddr, nbytes, *args)
+        self._done(start, nbytes)
+        return data
+
+    def writeto_mem(self, addr, memaddr, buf, *args):
+        start = utime.ticks_us()
+        self.target.writeto_mem(addr, memaddr, buf, *args)
+        self._done(start, len(buf))
+
+    def __getattr__(self, name):
+        return getattr(self.target, name)
+
+class NeoPixelProxy:
+    """ Stands in for a NeoPixel strip and times every refresh. """
+    def __init__(self, target, histogram):
+        self.target = target
+        self.buf = target.buf
+        self._histogram = histogram
+
+    def write(self):
+        start = utime.ticks_us()
+        self.target.write()
+        self._histogram.add(utime.ticks_diff(utime.ticks_us(), start))
+
+    def __getattr__(self, name):
+        return getattr(self.target, name)
+
+class Instrument:
+    """
+    Histograms by name. Functions are wrapped with `wrap()`, buses with
+    `i2c()` and `neopixel()`. A drop in gc.mem_alloc() across an outermost
+    wrapped call means a collection ran inside it; that call's latency goes
+    into the "gc" histogram as an upper bound of the pause. Wrappers call
+    straight through once `enabled` is False, so references kept elsewhere
+    stop measuring too.
+    """
+    def __init__(self):
+        self.enabled = True
+        self.histograms = {}
+        self.counters = {"i2c_bytes": 0}
+        self._depth = 0
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        return histogram
+
+    def wrap(self, name, function):
+        histogram = self.histogram(name)
+        collections = self.histogram("gc")
+        ticks_us = utime.ticks_us
+        ticks_diff = utime.ticks_diff
+        mem_alloc = gc.mem_alloc
+
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return function(*args, **kwargs)
+            self._depth += 1
+            used = mem_alloc()
+            start = ticks_us()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = ticks_diff(ticks_us(), start)
+                histogram.add(elapsed)
+                self._depth -= 1
+                if not self._depth and mem_alloc() < used:
+                    collections.add(elapsed)
+
+        return wrapper
+
+    def i2c(self, bus):
+        return I2CProxy(bus, self.histogram("i2c"), self.counters)
+
+    def neopixel(self, strip):
+        return NeoPixelProxy(strip, self.histogram("neopixel"))
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+        for name in self.counters:
+            self.counters[name] = 0
+
+    def stats(self):
+        """ {name: (count, total us, max us, buckets)} of everything used. """
+        result = {}
+        for name, histogram in self.histograms.items():
+            if histogram.count:
+                result[name] = (histogram.count, histogram.total, histogram.max, tuple(histogram.buckets))
+        result.update(self.counters)
+        return result
+
+    def report(self):
+        print("%-20s %8s %10s %8s %8s %8s" % ("", "calls", "total us", "p50", "p99", "max"))
+        for name in sorted(self.histograms):
+            histogram = self.histograms[name]
+            if histogram.count:
+                print("%-20s %8d %10d %8d %8d %8d" % (
+                    name, histogram.count, histogram.total,
+                    histogram.percentile(50), histogram.percentile(99), histogram.max))
+        for name, value in self.counters.items():
+            print("%-20s %8d" % (name, value))
@@ -0,0 +1,158 @@
+# MicroPython ESP32 binary sensor logger for BPI:bit/Web:bit
+
+"""
+Packs fixed layout sensor records into a preallocated page buffer and writes
+whole pages to a ring of segment files, so every flash write has the same
+size and the oldest data is overwritten once the ring is full. Decode the
+files on a PC with tools/logdecode.py.
+
+Page: 16 byte header "<4sIIHH" (magic, page sequence number, ticks_ms of
+the first record, record count, channel mask) followed by records. Bits 5
+and 6 of the mask hold the accelerometer range of the page, 0 to 3 for
++/-2, 4, 8 and 16 g, so accel counts per g are 16384 >> range. Record:
+ticks_ms delta to the previous record as "<H", then per channel in mask
+order: accel "<hhh", gyro "<hhh", magnetic "<hhh" (raw counts), light
+"<HH" (left, right) and temperature "<H" (raw 12-bit ADC codes).
+"""
+
+# pylint: disable=import-error
+import ustruct
+import utime
+from micropython import const
+# pylint: enable=import-error
+
+ACCEL = const(1)
+GYRO = const(2)
+MAGNETIC = const(4)
+LIGHT = const(8)
+TEMPERATURE = const(16)
+RANGE_SHIFT = const(5) # accelerometer range bits in the header mask
+
+MAGIC = b"BPL1"
+HEADER = "<4sIIHH"
+HEADER_SIZE = const(16)
+
+def record_size(channels):
+    size = 2
+    for bit, length in ((ACCEL, 6), (GYRO, 6), (MAGNETIC, 6), (LIGHT, 4), (TEMPERATURE, 2)):
+        if channels & bit:
+            size += length
+    return size
+
+class Logger:
+    """
+    Segment files are `prefix`0.bin to `prefix`N.bin for N = `segments` - 1,
+    each up to `segment_pages` pages of `page` bytes. Logging continues
+    after the newest page found in existing segments.
+    """
+    def __init__(self, prefix="log", channels=ACCEL | LIGHT | TEMPERATURE,
+                 segments=4, segment_pages=64, page=4096):
+        self._prefix = prefix
+        self.channels = channels
+        self._range = 0
+        self._segments = segments
+        self._segment_pages = segment_pages
+        self._page = bytearray(page)
+        self._record = record_size(channels)
+        self._file = None
+        self._count = 0
+        self._offset = HEADER_SIZE
+        self._base = 0
+        self._last = 0
+        self.pages = 0 # written since start
+        self.records = 0
+        self._resume()
+
+    def _name(self, segment):
+        return "%s%d.bin" % (self._prefix, segment)
+
+    def _resume(self):
+        # continue after the segment holding the highest sequence number
+        self.sequence = 0
+        self._segment = 0
+        header = bytearray(HEADER_SIZE)
+        for segment in range(self._segments):
+            try:
+                with open(self._name(segment), "rb") as f:
+                    if f.readinto(header) != HEADER_SIZE:
+                        continue
+                    magic, sequence, _, _, _ = ustruct.unpack(HEADER, header)
+                    pages = f.seek(0, 2) // len(self._page)
+            except OSError:
+                continue
+            if magic == MAGIC and sequence + pages >= self.sequence:
+                self.sequence = sequence + pages
+                self._segment = segment + 1
+        self._segment %= self._segments
+        self._segment_used = self._segment_pages # open a fresh segment first
+
+    def record(self, ticks, imu, magnetic, light_l, light_r, temperature):
+        """
+        Append one record. `imu` is an array of raw AX, AY, AZ, TEMP, GX,
+        GY, GZ as from MPU6500.sample_raw_into(), `magnetic` of raw X, Y, Z.
+        Channels not in the mask are ignored. A full page is written out.
+        """
+        if not self._count:
+            self._base = self._last = ticks
+        delta = utime.ticks_diff(ticks, self._last)
+        self._last = ticks
+        page = self._page
+        channels = self.channels
+        offset = self._offset
+        ustruct.pack_into("<H", page, offset, min(delta, 0xFFFF))
+        offset += 2
+        if channels & ACCEL:
+            ustruct.pack_into("<hhh", page, offset, imu[0], imu[1], imu[2])
+            offset += 6
+        if channels & GYRO:
+            ustruct.pack_into("<hhh", page, offset, imu[4], imu[5], imu[6])
+            offset += 6
+        if channels & MAGNETIC:
+            ustruct.pack_into("<hhh", page, offset, magnetic[0], magnetic[1], magnetic[2])
+            offset += 6
+        if channels & LIGHT:
+            ustruct.pack_into("<HH", page, offset, light_l, light_r)
+            offset += 4
+        if channels & TEMPERATURE:
+            ustruct.pack_into("<H", page, offset, temperature)
+            offset += 2
+        self._offset = offset
+        self._count += 1
+        self.records += 1
+        if offset + self._record > len(page):
+            self.flush()
+
+    def set_accel_range(self, code):
+        """
+        Accelerometer range of the following records, the ACCEL_FS_SEL code
+        0 to 3. A change ends the current page, one range per page.
+        """
+        if code != self._range:
+            self.flush()
+            self._range = code
+
+    def flush(self):
+        """ Write the current page out, even when it is not full. """
+        if not self._count:
+            return
+        ustruct.pack_into(HEADER, self._page, 0, MAGIC, self.sequence, self._base, self._count,
+                          self.channels | self._range << RANGE_SHIFT)
+        if self._segment_used >= self._segment_pages:
+            if self._file:
+                self._file.close()
+                self._segment = (self._segment + 1) % self._segments
+            self._file = open(self._name(self._segment), "wb")
+            self._segment_used = 0
+        self._file.write(self._page)
+        self._file.flush()
+        self._segment_used += 1
+        self.sequence += 1
+        self.pages += 1
+        self._count = 0
+        self._offset = HEADER_SIZE
+
+    def close(self):
+        self.flush()
+        if self._file:
+            self._file.close()
+            self._file = None
@@ -29,14 +29,21 @@ __version__ = "0.3.0-dev"
 # pylint: disable=import-error
 import ustruct
 import utime
+import micropython
+from array import array
 from machine import I2C, Pin
 from micropython import const
 # pylint: enable=import-error
 
+_SMPLRT_DIV = const(0x19)
+_CONFIG = const(0x1a)
 _GYRO_CONFIG = const(0x1b)
 _ACCEL_CONFIG = const(0x1c)
 _ACCEL_CONFIG2 = const(0x1d)
+_FIFO_EN = const(0x23)
 _INT_PIN_CFG = const(0x37)
+_INT_ENABLE = const(0x38)
+_INT_STATUS = const(0x3a)
 _ACCEL_XOUT_H = const(0x3b)
 _ACCEL_XOUT_L = const(0x3c)
 _ACCEL_YOUT_H = const(0x3d)
@@ -51,6 +58,9 @@ _GYRO_YOUT_H = const(0x45)
 _GYRO_YOUT_L = const(0x46)
 _GYRO_ZOUT_H = const(0x47)
 _GYRO_ZOUT_L = const(0x48)
+_USER_CTRL = const(0x6a)
+_FIFO_COUNTH = const(0x72)
+_FIFO_R_W = const(0x74)
 _WHO_AM_I = const(0x75)
 
 #_ACCEL_FS_MASK = const(0b00011000)
@@ -78,6 +88,20 @@ _GYRO_SO_2000DPS = 16.4
 _TEMP_SO = 333.87
 _TEMP_OFFSET = 21
 
+# FIFO streaming, see MPU-9250 register map rev 1.6
+_CONFIG_FIFO_MODE = const(0b01000000) # do not overwrite when full
+_CONFIG_DLPF_184HZ = const(0b00000001) # 1kHz internal sample rate
+_FIFO_EN_TEMP = const(0b10000000)
+_FIFO_EN_GYRO = const(0b01110000)
+_FIFO_EN_ACCEL = const(0b00001000)
+_USER_CTRL_FIFO_EN = const(0b01000000)
+_USER_CTRL_FIFO_RST = const(0b00000100)
+_INT_FIFO_OFLOW = const(0b00010000)
+
+# Data ready interrupt, INT pin active high 50us pulse
+_INT_RAW_RDY = const(0b00000001)
+_INT_PIN_CFG_MASK = const(0b11110000)
+
 # Used for enablind and disabling the i2c bypass access
 _I2C_BYPASS_MASK = const(0b00000010)
 _I2C_BYPASS_EN = const(0b00000010)
@@ -88,6 +112,13 @@ SF_M_S2 = 9.80665 # 1 g = 9.80665 m/s2 ie. standard gravity
 SF_DEG_S = 1
 SF_RAD_S = 0.017453292519943 # 1 deg/s is 0.017453292519943 rad/s
 
+def _unpack_shorts(buf, offset, out, count):
+    # Big endian shorts into an array('h') without allocating
+    for i in range(count):
+        value = buf[offset] << 8 | buf[offset + 1]
+        out[i] = value - 0x10000 if value & 0x8000 else value
+        offset += 2
+
 class MPU6500:
     """Class which provides interface to MPU6500 6-axis motion tracking device."""
     def __init__(
@@ -107,6 +138,19 @@ class MPU6500:
         self._accel_sf = accel_sf
         self._gyro_sf = gyro_sf
         self._gyro_offset = gyro_offset
+        self._burst = bytearray(14)
+
+        self._irq_pin = None
+
+        # FIFO ring buffer, empty until fifo_start()
+        self._fifo_frame = 0
+        self._fifo_frames = 0
+        self._fifo_buf = bytearray(0)
+        self._fifo_mv = memoryview(self._fifo_buf)
+        self._fifo_head = 0
+        self._fifo_len = 0
+        self.fifo_overflows = 0
+        self.fifo_dropped = 0
 
         # Enable I2C bypass to access for MPU9250 magnetometer access.
         char = self._register_char(_INT_PIN_CFG)
@@ -122,29 +166,16 @@ class MPU6500:
         return values in g if constructor was provided `accel_sf=SF_M_S2`
         parameter.
         """
-        so = self._accel_so
-        sf = self._accel_sf
-
-        xyz = self._register_three_shorts(_ACCEL_XOUT_H)
-        return tuple([value / so * sf for value in xyz])
+        x, y, z = self._register_three_shorts(_ACCEL_XOUT_H)
+        return self._convert_accel(x, y, z)
 
     @property
     def gyro(self):
         """
         X, Y, Z radians per second as floats.
         """
-        so = self._gyro_so
-        sf = self._gyro_sf
-        ox, oy, oz = self._gyro_offset
-
-        xyz = self._register_three_shorts(_GYRO_XOUT_H)
-        xyz = [value / so * sf for value in xyz]
-
-        xyz[0] -= ox
-        xyz[1] -= oy
-        xyz[2] -= oz
-
-        return tuple(xyz)
+        x, y, z = self._register_three_shorts(_GYRO_XOUT_H)
+        return self._convert_gyro(x, y, z)
 
     @property
     def temperature(self):
@@ -154,6 +185,232 @@ class MPU6500:
         temp = self._register_short(_TEMP_OUT_H)
         return ((temp - _TEMP_OFFSET) / _TEMP_SO) + _TEMP_OFFSET
 
+    def sample(self):
+        """
+        Acceleration, gyro and die temperature read with a single 14 byte
+        burst from ACCEL_XOUT_H to GYRO_ZOUT_L, so all values come from the
+        same instant. Returns a 3-tuple of (acceleration, gyro, temperature)
+        in the same units as the respective properties.
+        """
+        raw = self.sample_raw()
+        return (
+            self._convert_accel(raw[0], raw[1], raw[2]),
+            self._convert_gyro(raw[4], raw[5], raw[6]),
+            ((raw[3] - _TEMP_OFFSET) / _TEMP_SO) + _TEMP_OFFSET
+        )
+
+    def sample_raw(self):
+        """
+        Raw signed counts of AX, AY, AZ, TEMP, GX, GY, GZ as a 7-tuple read
+        with a single I2C transaction.
+        """
+        self.i2c.readfrom_mem_into(self.address, _ACCEL_XOUT_H, self._burst)
+        return ustruct.unpack(">hhhhhhh", self._burst)
+
+    def sample_raw_into(self, out):
+        """
+        Like `sample_raw()` but unpacks into `out`, an array('h') of at
+        least 7 items, without allocating.
+        """
+        self.i2c.readfrom_mem_into(self.address, _ACCEL_XOUT_H, self._burst)
+        _unpack_shorts(self._burst, 0, out, 7)
+
+    def accel_range(self, value=None):
+        """
+        Switch the accelerometer to one of the ACCEL_FS_SEL_* ranges. The
+        `acceleration` property keeps its units, raw counts change. Returns
+        the raw count of 1 g in the new range, or without `value` the
+        ACCEL_FS_SEL_* range in use.
+        """
+        if value is None:
+            return self._register_char(_ACCEL_CONFIG) & ACCEL_FS_SEL_16G
+        self._accel_so = self._accel_fs(value)
+        return self._accel_so
+
+    def fifo_start(self, rate=1000, accel=True, gyro=True, temperature=False, frames=128):
+        """
+        Start streaming samples into the hardware FIFO at `rate` Hz (4 to
+        1000). Frames drained with `fifo_drain()` are kept in a preallocated
+        ring buffer of `frames` entries. A frame holds the enabled values in
+        register order: AX, AY, AZ, TEMP, GX, GY, GZ.
+        """
+        enable = 0
+        size = 0
+        if accel:
+            enable |= _FIFO_EN_ACCEL
+            size += 6
+        if temperature:
+            enable |= _FIFO_EN_TEMP
+            size += 2
+        if gyro:
+            enable |= _FIFO_EN_GYRO
+            size += 6
+        if not size:
+            raise ValueError("FIFO needs at least one source.")
+
+        self.fifo_stop()
+
+        self._fifo_frame = size
+        self._fifo_frames = frames
+        self._fifo_buf = bytearray(size * frames)
+        self._fifo_mv = memoryview(self._fifo_buf)
+        self._fifo_head = 0
+        self._fifo_len = 0
+        self.fifo_overflows = 0
+        self.fifo_dropped = 0
+
+        rate = min(max(rate, 4), 1000)
+        self._register_char(_CONFIG, _CONFIG_FIFO_MODE | _CONFIG_DLPF_184HZ)
+        self._register_char(_SMPLRT_DIV, 1000 // rate - 1)
+        self._register_char(_INT_ENABLE, self._register_char(_INT_ENABLE) | _INT_FIFO_OFLOW)
+        self._register_char(_INT_STATUS) # clear stale overflow
+        self._register_char(_FIFO_EN, enable)
+        self._register_char(_USER_CTRL, _USER_CTRL_FIFO_EN | _USER_CTRL_FIFO_RST)
+
+    def fifo_stop(self):
+        """ Stop streaming and flush the hardware FIFO. """
+        self._register_char(_FIFO_EN, 0)
+        self._register_char(_USER_CTRL, _USER_CTRL_FIFO_RST)
+        self._register_char(_INT_ENABLE, self._register_char(_INT_ENABLE) & ~_INT_FIFO_OFLOW)
+
+    def fifo_count(self):
+        """ Number of bytes waiting in the hardware FIFO. """
+        return self._register_short(_FIFO_COUNTH) & 0x1fff
+
+    def fifo_drain(self):
+        """
+        Move all complete frames from the hardware FIFO into the ring buffer
+        reading straight into it with as few bursts as possible. Returns
+        the number of frames moved. When the ring is full the oldest frames
+        are overwritten and counted in `fifo_dropped`, a hardware FIFO
+        overflow is counted in `fifo_overflows`.
+        """
+        size = self._fifo_frame
+        if not size:
+            return 0 # not started
+        capacity = self._fifo_frames
+        overflow = self._register_char(_INT_STATUS) & _INT_FIFO_OFLOW
+        frames = self.fifo_count() // size
+        moved = frames
+
+        while frames:
+            head = self._fifo_head
+            count = min(frames, capacity - head)
+            self.i2c.readfrom_mem_into(
+                self.address, _FIFO_R_W,
+                self._fifo_mv[head * size:(head + count) * size]
+            )
+            self._fifo_head = (head + count) % capacity
+            self._fifo_len += count
+            frames -= count
+
+        if self._fifo_len > capacity:
+            self.fifo_dropped += self._fifo_len - capacity
+            self._fifo_len = capacity
+
+        if overflow:
+            # Full FIFO may end with a partial frame, start over aligned.
+            self.fifo_overflows += 1
+            self._register_char(_USER_CTRL, _USER_CTRL_FIFO_EN | _USER_CTRL_FIFO_RST)
+
+        return moved
+
+    @property
+    def fifo_available(self):
+        """ Number of frames waiting in the ring buffer. """
+        return self._fifo_len
+
+    def fifo_read(self, out):
+        """
+        Pop the oldest frame from the ring buffer into `out`, an array('h')
+        with one slot per value in the frame. Values are raw signed counts.
+        Returns False when the ring buffer is empty.
+        """
+        if not self._fifo_len:
+            return False
+
+        offset = (self._fifo_head - self._fifo_len) % self._fifo_frames * self._fifo_frame
+        _unpack_shorts(self._fifo_buf, offset, out, self._fifo_frame // 2)
+        self._fifo_len -= 1
+        return True
+
+    def irq_start(self, pin, callback, rate=100):
+        """
+        Sample at `rate` Hz (4 to 1000) paced by the data ready interrupt on
+        `pin`, the machine.Pin wired to the INT output. For each sample the
+        handler schedules one burst read and calls `callback(sample, ticks)`
+        where `sample` is a preallocated array('h') of raw AX, AY, AZ, TEMP,
+        GX, GY, GZ counts and `ticks` the `utime.ticks_us()` of the
+        interrupt. The array is reused, copy values you want to keep.
+        Interrupts arriving while a read is still pending are counted in
+        `irq_missed`.
+        """
+        self.irq_stop()
+
+        self._irq_pin = pin
+        self._irq_callback = callback
+        self._irq_sample = array("h", (0, 0, 0, 0, 0, 0, 0))
+        self._irq_read_ref = self._irq_read
+        self._irq_pending = False
+        self._irq_ticks = 0
+        self.irq_missed = 0
+
+        rate = min(max(rate, 4), 1000)
+        config = self._register_char(_CONFIG) & _CONFIG_FIFO_MODE
+        self._register_char(_CONFIG, config | _CONFIG_DLPF_184HZ)
+        self._register_char(_SMPLRT_DIV, 1000 // rate - 1)
+
+        # Active high push-pull 50us pulse, keep the bypass setting
+        char = self._register_char(_INT_PIN_CFG)
+        self._register_char(_INT_PIN_CFG, char & ~_INT_PIN_CFG_MASK)
+
+        pin.init(Pin.IN)
+        # hard so the time stamp is taken at the edge, not when the
+        # scheduler gets to it; only the I2C read is scheduled
+        pin.irq(trigger=Pin.IRQ_RISING, handler=self._irq_isr, hard=True)
+        self._register_char(_INT_ENABLE, self._register_char(_INT_ENABLE) | _INT_RAW_RDY)
+
+    def irq_stop(self):
+        """ Stop interrupt driven sampling. """
+        self._register_char(_INT_ENABLE, self._register_char(_INT_ENABLE) & ~_INT_RAW_RDY)
+        pin = self._irq_pin
+        if pin is not None:
+            pin.irq(handler=None)
+            self._irq_pin = None
+
+    @property
+    def irq_running(self):
+        """ True between `irq_start()` and `irq_stop()`. """
+        return self._irq_pin is not None
+
+    def _irq_isr(self, pin):
+        # Runs in hard interrupt context: no allocation, no I2C
+        if self._irq_pending:
+            self.irq_missed += 1
+            return
+        self._irq_ticks = utime.ticks_us()
+        self._irq_pending = True
+        try:
+            micropython.schedule(self._irq_read_ref, 0)
+        except RuntimeError:
+            self._irq_pending = False
+            self.irq_missed += 1
+
+    def _irq_read(self, _):
+        self.i2c.readfrom_mem_into(self.address, _ACCEL_XOUT_H, self._burst)
+        self._irq_pending = False
+        _unpack_shorts(self._burst, 0, self._irq_sample, 7)
+        self._irq_callback(self._irq_sample, self._irq_ticks)
+
+    @property
+    def gyro_offset(self):
+        """ Gyro bias subtracted from readings, in gyro units. """
+        return self._gyro_offset
+
+    def set_gyro_offset(self, offset=(0, 0, 0)):
+        """ Apply a gyro bias, eg. saved from an earlier `calibrate()`. """
+        self._gyro_offset = tuple(offset)
+
     @property
     def whoami(self):
         """ Value of the whoami register. """
@@ -175,6 +432,17 @@ class MPU6500:
         self._gyro_offset = (ox / n, oy / n, oz / n)
         return self._gyro_offset
 
+    def _convert_accel(self, x, y, z):
+        so = self._accel_so
+        sf = self._accel_sf
+        return (x / so * sf, y / so * sf, z / so * sf)
+
+    def _convert_gyro(self, x, y, z):
+        so = self._gyro_so
+        sf = self._gyro_sf
+        ox, oy, oz = self._gyro_offset
+        return (x / so * sf - ox, y / so * sf - oy, z / so * sf - oz)
+
     def _register_short(self, register, value=None, buf=bytearray(2)):
         if value is None:
             self.i2c.readfrom_mem_into(self.address, register, buf)
@@ -192,7 +460,7 @@ class MPU6500:
             self.i2c.readfrom_mem_into(self.address, register, buf)
             return buf[0]
 
-        ustruct.pack_into("<b", buf, 0, value)
+        ustruct.pack_into("<B", buf, 0, value)
         return self.i2c.writeto_mem(self.address, register, buf)
 
     def _accel_fs(self, value):
@@ -70,6 +70,29 @@ class MPU9250:
         """
         return self.ak8963.magnetic
 
+    def sample(self, magnetic=True):
+        """
+        Acceleration, gyro and temperature from a single MPU6500 burst read,
+        optionally followed by one AK8963 burst read. Returns a 4-tuple of
+        (acceleration, gyro, magnetic, temperature), magnetic is None when
+        `magnetic=False`.
+        """
+        acceleration, gyro, temperature = self.mpu6500.sample()
+        return (
+            acceleration, gyro,
+            self.ak8963.magnetic if magnetic else None,
+            temperature
+        )
+
+    def irq_start(self, pin, callback, rate=100):
+        """
+        Interrupt driven sampling of the MPU6500, see `MPU6500.irq_start()`.
+        """
+        self.mpu6500.irq_start(pin, callback, rate)
+
+    def irq_stop(self):
+        self.mpu6500.irq_stop()
+
     @property
     def whoami(self):
         return self.mpu6500.whoami
@@ -0,0 +1,115 @@
+# MicroPython ESP32 framed binary telemetry for BPI:bit/Web:bit
+
+"""
+Streams raw sensor codes as small binary frames to any object with a
+write() method, a machine.UART or sys.stdout.buffer for USB serial. Decode
+them on a PC with tools/telemetrydecode.py.
+
+Frame, little endian:
+
+    0xA5 0x5A   sync
+    length      bytes from channels to the end of the payload, "<B"
+    channels    mask: accel 1, gyro 2, magnetic 4, light 8, temperature 16,
+                bits 5 and 6 the accelerometer range 0 to 3 for +/-2, 4,
+                8 and 16 g, accel counts per g are 16384 >> range
+    sequence    "<H", +1 per frame, gaps mean lost frames
+    ticks       utime.ticks_us() of the sample, "<I"
+    payload     accel "<hhh", gyro "<hhh", magnetic "<hhh" (raw counts),
+                light "<HH", temperature "<H" (raw 12-bit ADC codes), in
+                mask order
+    crc         CRC-16/CCITT-FALSE of length to payload, "<H"
+"""
+
+# pylint: disable=import-error
+import micropython
+import ustruct
+from array import array
+from micropython import const
+# pylint: enable=import-error
+
+ACCEL = const(1)
+GYRO = const(2)
+MAGNETIC = const(4)
+LIGHT = const(8)
+TEMPERATURE = const(16)
+RANGE_SHIFT = const(5) # accelerometer range bits in the channel mask
+
+_HEADER = const(10)
+
+def _crc_table():
+    table = array("H", (0 for _ in range(256)))
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            crc = (crc << 1 ^ 0x1021 if crc & 0x8000 else crc << 1) & 0xFFFF
+        table[i] = crc
+    return table
+
+_CRC_TABLE = _crc_table()
+
+@micropython.native
+def crc16(buf, start, end):
+    """ CRC-16/CCITT-FALSE of buf[start:end] without slicing. """
+    table = _CRC_TABLE
+    crc = 0xFFFF
+    for i in range(start, end):
+        crc = (crc << 8 & 0xFF00) ^ table[(crc >> 8) ^ buf[i]]
+    return crc
+
+def payload_size(channels):
+    size = 0
+    for bit, length in ((ACCEL, 6), (GYRO, 6), (MAGNETIC, 6), (LIGHT, 4), (TEMPERATURE, 2)):
+        if channels & bit:
+            size += length
+    return size
+
+class Telemetry:
+    """
+    One preallocated frame buffer is filled and written per `send()`.
+    `sent` counts frames, `short` those the stream did not take completely
+    (eg. a UART with a write timeout), the receiver sees those as errors.
+    """
+    def __init__(self, stream, channels):
+        self._stream = stream
+        self.channels = channels
+        self._end = _HEADER + payload_size(channels)
+        self._frame = bytearray(self._end + 2)
+        ustruct.pack_into("<BBBB", self._frame, 0, 0xA5, 0x5A, self._end - 3, channels)
+        self.sequence = 0
+        self.sent = 0
+        self.short = 0
+
+    def send(self, ticks, imu, magnetic, adc):
+        """
+        Frame and write one sample. `imu` holds raw AX, AY, AZ, TEMP, GX,
+        GY, GZ, `magnetic` raw X, Y, Z and `adc` the light L, light R and
+        thermistor codes; channels not in the mask are ignored.
+        """
+        frame = self._frame
+        channels = self.channels
+        ustruct.pack_into("<HI", frame, 4, self.sequence, ticks)
+        offset = _HEADER
+        if channels & ACCEL:
+            ustruct.pack_into("<hhh", frame, offset, imu[0], imu[1], imu[2])
+            offset += 6
+        if channels & GYRO:
+            ustruct.pack_into("<hhh", frame, offset, imu[4], imu[5], imu[6])
+            offset += 6
+        if channels & MAGNETIC:
+            ustruct.pack_into("<hhh", frame, offset, magnetic[0], magnetic[1], magnetic[2])
+            offset += 6
+        if channels & LIGHT:
+            ustruct.pack_into("<HH", frame, offset, adc[0], adc[1])
+            offset += 4
+        if channels & TEMPERATURE:
+            ustruct.pack_into("<H", frame, offset, adc[2])
+        ustruct.pack_into("<H", frame, self._end, crc16(frame, 2, self._end))
+        written = self._stream.write(frame)
+        if written is not None and written < len(frame):
+            self.short += 1
+        self.sequence = (self.sequence + 1) & 0xFFFF
+        self.sent += 1
+
+    def set_accel_range(self, code):
+        """ Accelerometer range of the following frames, ACCEL_FS_SEL code 0 to 3. """
+        self._frame[3] = self.channels | code << RANGE_SHIFT
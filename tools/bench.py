@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+# Host benchmark suite for BPIBIT on the simulator in tools/sim
+
+"""
+Runs every public BPIBIT function on the host against the simulated board in
+tools/sim and reports, per call:
+
+    host us    wall time of the Python code on this machine
+    sim ms     virtual board time the call waits for (pauses, delays)
+    i2c tx     I2C transactions, one per register burst
+    i2c B      bytes on the I2C bus, register address included
+    np wr      NeoPixel refreshes
+    adc        ADC reads
+    alloc B    peak Python heap growth during the call (CPython, a proxy)
+
+Counters and virtual time are deterministic, host time is not. Use
+`--json` to save a run and `--baseline` to fail (exit 1) when a later run
+needs more bus traffic, refreshes, reads or memory, or more than
+`--tolerance` extra host time. A full run also lists any public function no
+benchmark called as NOT COVERED:
+
+    python3 tools/bench.py --json bench.json
+    python3 tools/bench.py --baseline bench.json --tolerance 0.5
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(_ROOT, "tools", "sim"), _ROOT]
+
+import machine # noqa: E402
+import neopixel # noqa: E402
+import uasyncio # noqa: E402
+import utime # noqa: E402
+
+_COUNTERS = ("i2c_tx", "i2c_bytes", "neopixel_writes", "adc_reads")
+_COLUMNS = (
+    ("host_us", "host us", "%.1f"), ("sim_ms", "sim ms", "%.1f"),
+    ("i2c_tx", "i2c tx", "%.1f"), ("i2c_bytes", "i2c B", "%.1f"),
+    ("neopixel_writes", "np wr", "%.2f"), ("adc_reads", "adc", "%.1f"),
+    ("alloc_bytes", "alloc B", "%d"),
+)
+
+_IMU_INT = 16 # free GPIO standing in for the MPU-6500 INT line
+_BUTTON_A = 35
+_ALLOC_SLACK = 128 # bytes of heap noise tolerated by --baseline
+
+def _counters():
+    return (machine.SoftI2C.transactions, machine.SoftI2C.bytes,
+            neopixel.NeoPixel.writes, machine.ADC.reads)
+
+class _Sink:
+    # a UART that takes everything and keeps nothing
+    def write(self, buf):
+        return len(buf)
+
+def _benchmarks(bpibit):
+    # (name, calls, function, setup, teardown); setup runs once, untimed
+    toggle = [0]
+
+    def alternate(first, second):
+        # alternate so the framebuffer diff cannot skip the refresh
+        def call():
+            toggle[0] ^= 1
+            (first if toggle[0] else second)()
+        return call
+
+    frame = bytes(range(75))
+    animation = bpibit.compileAnimation(['R' * 25, '*' * 25, '*' * 24 + 'G'], durations=20)
+    chart = 'RGBYW' * 5
+    music = bpibit.packMusic([('C4', 8), ('E4', 8), ('G4', 8), ('C5', 8)] * 4)
+
+    def tick10ms():
+        utime.sleep_ms(10)
+
+    hue = [0]
+
+    def rainbow():
+        hue[0] += 3
+        for i in range(25):
+            bpibit.led(i, bpibit.hsv(hue[0] + i * 14))
+        bpibit.ledShow()
+
+    def rainbow_setup():
+        bpibit.ledAutoShow(False)
+        bpibit.ledBrightness(64)
+        bpibit.ledGamma(2.2)
+
+    def rainbow_teardown():
+        bpibit.ledGamma(1.0)
+        bpibit.ledBrightness(255)
+        bpibit.ledAutoShow(True)
+
+    def run_async(coroutine):
+        # one coroutine to completion on a fresh event loop
+        return lambda: uasyncio.run(coroutine())
+
+    async def stream_next():
+        await bpibit.sensorStream(bpibit.lightLevel, period=10).__anext__()
+
+    def click():
+        # press and release button A, then wait out the double click window
+        machine.Pin.drive(_BUTTON_A, 0)
+        utime.sleep_ms(50)
+        machine.Pin.drive(_BUTTON_A, 1)
+        utime.sleep_ms(400)
+
+    def imu_edge():
+        # one data ready pulse on the interrupt pin
+        machine.Pin.drive(_IMU_INT, 1)
+        machine.Pin.drive(_IMU_INT, 0)
+
+    def imu_sampling_setup():
+        bpibit.onIMUSample(imu_handler)
+        bpibit.startIMUSampling(_IMU_INT, rate=100)
+
+    def imu_sampling_teardown():
+        bpibit.stopIMUSampling()
+        bpibit.removeIMUSample(imu_handler)
+
+    def imu_handler(sample, ticks):
+        pass
+
+    def gesture_handler():
+        pass
+
+    def gestures_setup():
+        bpibit.startGestures(rate=50)
+        bpibit.onGesture('shake', gesture_handler)
+
+    def gestures_teardown():
+        bpibit.removeGesture('shake', gesture_handler)
+        bpibit.stopGestures()
+
+    def gesture_queries():
+        bpibit.currentGesture()
+        bpibit.isGesture('face up')
+        bpibit.wasGesture('shake')
+
+    def stats_setup():
+        bpibit.enableStats(True)
+        bpibit.resetStats()
+
+    def stats_teardown():
+        bpibit.enableStats(False)
+
+    return (
+        ("led", 200, alternate(lambda: bpibit.led(12, (9, 9, 9)), lambda: bpibit.led(12, (0, 0, 0))), None, None),
+        ("ledAll", 200, alternate(lambda: bpibit.ledAll((1, 2, 3)), lambda: bpibit.ledAll((0, 0, 0))), None, None),
+        ("ledCode", 200, alternate(lambda: bpibit.ledCode(3, 'R'), lambda: bpibit.ledCode(3, '*')), None, None),
+        ("ledCodeAll", 200, alternate(lambda: bpibit.ledCodeAll('G'), lambda: bpibit.ledCodeAll('*')), None, None),
+        ("ledCodeArray", 200, alternate(lambda: bpibit.ledCodeArray(chart), lambda: bpibit.ledCodeArray(chart[::-1])), None, None),
+        ("ledCodeArray (unchanged)", 200, lambda: bpibit.ledCodeArray(chart), None, None),
+        ("ledCodeRow", 200, alternate(lambda: bpibit.ledCodeRow(2, 'RGBYW'), lambda: bpibit.ledCodeRow(2, '*****')), None, None),
+        ("ledCodeColumn", 200, alternate(lambda: bpibit.ledCodeColumn(2, 'RGBYW'), lambda: bpibit.ledCodeColumn(2, '*****')), None, None),
+        ("ledBlit", 200, alternate(lambda: bpibit.ledBlit(frame), lambda: bpibit.ledBlit(bytes(75))), None, None),
+        ("ledOff", 200, bpibit.ledOff, None, None),
+        ("plotBarGraph", 200, alternate(lambda: bpibit.plotBarGraph(300), lambda: bpibit.plotBarGraph(900)), None, None),
+        ("rainbow frame (hsv, gamma)", 100, rainbow, rainbow_setup, rainbow_teardown),
+        ("ledBrightness", 100, alternate(lambda: bpibit.ledBrightness(32), lambda: bpibit.ledBrightness(255)),
+            None, lambda: bpibit.ledBrightness(255)),
+        ("ledGamma", 20, alternate(lambda: bpibit.ledGamma(2.2), lambda: bpibit.ledGamma(1.0)),
+            None, lambda: bpibit.ledGamma(1.0)),
+        ("ledCodeBrightness", 20, alternate(lambda: bpibit.ledCodeBrightness(96), lambda: bpibit.ledCodeBrightness(48)),
+            None, lambda: bpibit.ledCodeBrightness(48)),
+        ("ledPalette", 200, lambda: bpibit.ledPalette('X', (10, 20, 30)), None, None),
+        ("rgb", 200, lambda: bpibit.rgb(10, 20, 30), None, None),
+        ("hsv", 200, lambda: bpibit.hsv(200, 255, 128), None, None),
+        ("ledShow (unchanged)", 200, bpibit.ledShow, None, None),
+        ("ledShow (forced)", 200, lambda: bpibit.ledShow(True), None, None),
+        ("ledAutoShow", 200, alternate(lambda: bpibit.ledAutoShow(False), bpibit.ledAutoShow), None, bpibit.ledAutoShow),
+        ("scrollText 'Hello'", 5, lambda: bpibit.scrollText('Hello', delay=150), None, None),
+        ("scrollTextTick", 200, bpibit.scrollTextTick,
+            lambda: bpibit.scrollTextStart('Hello world', loop=True, timer=False), bpibit.scrollTextStop),
+        ("scrollTextSet", 200, alternate(lambda: bpibit.scrollTextSet('Hi'), lambda: bpibit.scrollTextSet('Ho', 'R')),
+            lambda: bpibit.scrollTextStart('Hello', loop=True, timer=False), bpibit.scrollTextStop),
+        ("scrollTextRunning", 200, bpibit.scrollTextRunning, None, None),
+        ("scrollTextAsync 'Hi'", 5, run_async(lambda: bpibit.scrollTextAsync('Hi', delay=150)), None, None),
+        ("compileAnimation", 50, lambda: bpibit.compileAnimation(['R' * 25, '*' * 25, 'G' * 25]), None, None),
+        ("playAnimation", 200, lambda: bpibit.playAnimation(animation, timer=False), None, bpibit.stopAnimation),
+        ("playAnimationAsync", 5, run_async(lambda: bpibit.playAnimationAsync(animation, loop=False)), None, None),
+        ("animationPlaying", 200, bpibit.animationPlaying, None, None),
+        ("animationTick", 200, bpibit.animationTick,
+            lambda: bpibit.playAnimation(bpibit.compileAnimation(['R' * 25, '*' * 25, '*' * 24 + 'G']), timer=False),
+            bpibit.stopAnimation),
+        ("chartTick (light, autoscale)", 200, bpibit.chartTick,
+            lambda: bpibit.startChart('light', mode='histogram', timer=False), bpibit.stopChart),
+        ("chartAdd", 200, lambda: bpibit.chartAdd(toggle[0] * 100),
+            lambda: bpibit.startChart('light', timer=False), bpibit.stopChart),
+        ("chartAdd (2 series, fixed range)", 200, lambda: bpibit.chartAdd(20, 80),
+            lambda: bpibit.startChart(('light', 'temperature'), low=0, high=100, timer=False), bpibit.stopChart),
+        ("chartRange", 200, bpibit.chartRange,
+            lambda: bpibit.startChart('acceleration', timer=False), bpibit.stopChart),
+        ("chartRunning", 200, bpibit.chartRunning, None, None),
+        ("playTone", 200, lambda: bpibit.playTone('C4D4', 0), None, bpibit.noTone),
+        ("playToneAsync", 20, run_async(lambda: bpibit.playToneAsync('C4', 10)), None, None),
+        ("analogPitch", 200, lambda: bpibit.analogPitch(440, 0), None, bpibit.noTone),
+        ("analogPitchAsync", 20, run_async(lambda: bpibit.analogPitchAsync(440, 10)), None, None),
+        ("analogSetPitchPin", 200, lambda: bpibit.analogSetPitchPin(0), None, None),
+        ("noTone", 200, alternate(lambda: bpibit.analogPitch(440, 0), bpibit.noTone), None, None),
+        ("rest", 200, lambda: bpibit.rest(0), None, None),
+        ("restAsync", 20, run_async(lambda: bpibit.restAsync(10)), None, None),
+        ("packMusic", 50, lambda: bpibit.packMusic([('C4', 8), ('E4', 8), ('G4', 4), ('R', 4)]), None, None),
+        ("queueMusic", 200, lambda: bpibit.queueMusic(music),
+            lambda: bpibit.playMusic(music, tempo=240), bpibit.stopMusic),
+        ("setMusicTempo", 200, alternate(lambda: bpibit.setMusicTempo(120), lambda: bpibit.setMusicTempo(240)),
+            lambda: bpibit.playMusic(music, tempo=240, loop=True), bpibit.stopMusic),
+        ("musicPlaying", 200, bpibit.musicPlaying, None, None),
+        ("stopMusic", 200, alternate(lambda: bpibit.playMusic(music), bpibit.stopMusic), None, None),
+        ("playMusic 10 ms", 200, tick10ms,
+            lambda: bpibit.playMusic(music, tempo=240, loop=True), bpibit.stopMusic),
+        ("parseRTTTL", 50, lambda: bpibit.parseRTTTL('t:d=4,o=5,b=120:c,e,g,8c6,p,8g,a#,2c6'), None, None),
+        ("lightLevel", 200, bpibit.lightLevel, None, None),
+        ("lightLevelL", 200, bpibit.lightLevelL, None, None),
+        ("lightLevelR", 200, bpibit.lightLevelR, None, None),
+        ("temperature", 200, bpibit.temperature, None, None),
+        ("temperatureRaw", 200, bpibit.temperatureRaw, None, None),
+        ("temperatureCenti", 200, bpibit.temperatureCenti, None, None),
+        ("sampledBuffer", 200, lambda: bpibit.sampledBuffer('lightL'),
+            lambda: bpibit.startSampling(rate=100), bpibit.stopSampling),
+        ("sensorStream next", 20, run_async(stream_next), None, None),
+        ("sampledValue (100 Hz)", 200, lambda: (tick10ms(), bpibit.sampledValue('lightL')),
+            lambda: bpibit.startSampling(rate=100), bpibit.stopSampling),
+        ("analogReadPin", 200, lambda: bpibit.analogReadPin(1), None, None),
+        ("analogWritePin", 200, alternate(lambda: bpibit.analogWritePin(2, 100), lambda: bpibit.analogWritePin(2, 900)),
+            None, lambda: bpibit.releasePin(2)),
+        ("servoWritePin", 200, alternate(lambda: bpibit.servoWritePin(1, 0), lambda: bpibit.servoWritePin(1, 180)),
+            None, lambda: bpibit.servoWritePinOff(1)),
+        ("servoWritePinOff", 200, alternate(lambda: bpibit.servoWritePin(1, 90), lambda: bpibit.servoWritePinOff(1)),
+            None, None),
+        ("releasePin", 200, alternate(lambda: bpibit.digitalWritePin(8, 1), lambda: bpibit.releasePin(8)), None, None),
+        ("pinMask", 200, lambda: bpibit.pinMask((0, 1, 2, 5, 8, 11)), None, None),
+        ("digitalReadPin", 200, lambda: bpibit.digitalReadPin(5), None, None),
+        ("digitalWritePin", 200, lambda: bpibit.digitalWritePin(8, toggle[0]), None, None),
+        ("digitalReadPins", 200, lambda: bpibit.digitalReadPins((0, 1, 2, 5, 8, 11)), None, None),
+        ("digitalWritePins", 200, lambda: bpibit.digitalWritePins((12, 13, 14), 0b101), None, None),
+        ("pinIsTouched", 200, lambda: bpibit.pinIsTouched(1), None, None),
+        ("touchedPins (20 Hz scan)", 200, lambda: (utime.sleep_ms(50), bpibit.touchedPins()),
+            bpibit.startTouch, bpibit.stopTouch),
+        ("touchEvent", 200, bpibit.touchEvent, bpibit.startTouch, bpibit.stopTouch),
+        ("touchWakeup", 50, bpibit.touchWakeup, bpibit.startTouch, bpibit.stopTouch),
+        ("onButtonPressed", 200, lambda: bpibit.onButtonPressed('A'), None, None),
+        ("onButtonPressed AB", 200, lambda: bpibit.onButtonPressed('AB'), None, None),
+        ("onButtonPressedAsync", 20, run_async(lambda: bpibit.onButtonPressedAsync('A')),
+            lambda: machine.Pin.drive(_BUTTON_A, 0), lambda: machine.Pin.drive(_BUTTON_A, 1)),
+        ("buttonEvent (click)", 200, lambda: (click(), bpibit.buttonEvent()),
+            bpibit.startButtonEvents, bpibit.stopButtonEvents),
+        ("buttonEventAsync (click)", 20, lambda: (click(), uasyncio.run(bpibit.buttonEventAsync())),
+            bpibit.startButtonEvents, bpibit.stopButtonEvents),
+        ("buttonEvents", 200, bpibit.buttonEvents, bpibit.startButtonEvents, bpibit.stopButtonEvents),
+        ("clearButtonEvents", 200, bpibit.clearButtonEvents, bpibit.startButtonEvents, bpibit.stopButtonEvents),
+        ("sampleIMU", 200, bpibit.sampleIMU, None, None),
+        ("acceleration", 200, lambda: bpibit.acceleration('x'), None, None),
+        ("acceleration (cached)", 200, lambda: bpibit.acceleration('x', refresh=False), None, None),
+        ("gyroscope", 200, lambda: bpibit.gyroscope('x'), None, None),
+        ("magneticForce", 200, lambda: bpibit.magneticForce('x'), None, None),
+        ("rotationPitch", 200, bpibit.rotationPitch, None, None),
+        ("rotationRoll", 200, bpibit.rotationRoll, None, None),
+        ("compassHeading", 200, bpibit.compassHeading, None, None),
+        ("fusion step (100 Hz)", 200, tick10ms,
+            lambda: bpibit.startFusion(rate=100), bpibit.stopFusion),
+        ("fusionHeading", 200, bpibit.fusionHeading,
+            lambda: bpibit.startFusion(rate=100), bpibit.stopFusion),
+        ("fusionPitch", 200, bpibit.fusionPitch, lambda: bpibit.startFusion(rate=100), bpibit.stopFusion),
+        ("fusionRoll", 200, bpibit.fusionRoll, lambda: bpibit.startFusion(rate=100), bpibit.stopFusion),
+        ("fusionQuaternion", 200, bpibit.fusionQuaternion, lambda: bpibit.startFusion(rate=100), bpibit.stopFusion),
+        ("IMU sample interrupt", 200, imu_edge, imu_sampling_setup, imu_sampling_teardown),
+        ("gesture step (50 Hz)", 200, lambda: utime.sleep_ms(20), gestures_setup, gestures_teardown),
+        ("gesture queries", 200, gesture_queries, gestures_setup, gestures_teardown),
+        ("logging step (100 Hz)", 200, tick10ms,
+            lambda: bpibit.startLogging(rate=100), bpibit.stopLogging),
+        ("loggingStatus", 200, bpibit.loggingStatus, None, None),
+        ("telemetry frame (100 Hz)", 200, tick10ms,
+            lambda: bpibit.startTelemetry(rate=100, uart=_Sink()), bpibit.stopTelemetry),
+        ("telemetryStatus", 200, bpibit.telemetryStatus, None, None),
+        ("compass calibration step (100 ms)", 100, lambda: utime.sleep_ms(100),
+            lambda: bpibit.startCompassCalibration(count=100000), bpibit.stopCompassCalibration),
+        ("compassCalibrationProgress", 200, bpibit.compassCalibrationProgress, None, None),
+        ("calibrateCompass 10 x 10 ms", 2, lambda: bpibit.calibrateCompass(count=10, delay=10), None, None),
+        ("calibrateCompassAsync 10 x 10 ms", 2, run_async(lambda: bpibit.calibrateCompassAsync(count=10, delay=10)),
+            None, None),
+        ("calibrateGyro 16 samples", 5, lambda: bpibit.calibrateGyro(count=16), None, None),
+        ("clearCalibration", 20, bpibit.clearCalibration, None, None),
+        ("led with stats", 200, alternate(lambda: bpibit.led(12, (9, 9, 9)), lambda: bpibit.led(12, (0, 0, 0))),
+            stats_setup, stats_teardown),
+        ("stats", 200, bpibit.stats, stats_setup, stats_teardown),
+        ("getI2C", 200, bpibit.getI2C, None, None),
+        ("getIMU", 200, bpibit.getIMU, None, None),
+        ("getSPI", 20, bpibit.getSPI, None, None),
+        ("getHSPI", 20, bpibit.getHSPI, None, None),
+        ("getVSPI", 20, bpibit.getVSPI, None, None),
+        ("pause 1 ms", 200, lambda: bpibit.pause(1), None, None),
+        ("pauseMicros 100 us", 200, lambda: bpibit.pauseMicros(100), None, None),
+        ("pauseAsync 1 ms", 20, run_async(lambda: bpibit.pauseAsync(1)), None, None),
+        ("runningTime", 200, bpibit.runningTime, None, None),
+        ("runningTimeMicros", 200, bpibit.runningTimeMicros, None, None),
+        ("backgroundError", 200, bpibit.backgroundError, None, None),
+    )
+
+def _measure(calls, function):
+    # timing pass without tracemalloc, it slows allocation down a lot
+    machine.reset_counters()
+    start_sim = utime.now
+    start = time.perf_counter_ns()
+    for _ in range(calls):
+        function()
+    elapsed = time.perf_counter_ns() - start
+    result = {
+        "host_us": elapsed / calls / 1000,
+        "sim_ms": (utime.now - start_sim) / calls / 1000,
+    }
+    for name, value in zip(_COUNTERS, _counters()):
+        result[name] = value / calls
+
+    tracemalloc.start()
+    peak = 0
+    for _ in range(min(calls, 20)):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        function()
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+    result["alloc_bytes"] = peak
+    return result
+
+def _public(module):
+    # code objects of the public functions, async ones included
+    return {value.__code__: name for name, value in vars(module).items()
+            if not name.startswith("_") and callable(value) and getattr(value, "__module__", None) == module.__name__
+            and hasattr(value, "__code__")}
+
+def run(pattern=None, uncovered=None):
+    """
+    Import BPIBIT on the simulator and benchmark it, {name: metrics}. Names
+    of public functions no benchmark calls are added to the `uncovered` list.
+    """
+    import BPIBIT
+    BPIBIT.getIMU() # probe outside of the measurements
+    BPIBIT.ledShow(True)
+    public = _public(BPIBIT)
+    called = set()
+
+    def trace(frame, event, arg):
+        # setup, warm up and teardown only, the timed calls run untraced
+        if event == "call" and frame.f_code in public:
+            called.add(public[frame.f_code])
+
+    results = {}
+    for name, calls, function, setup, teardown in _benchmarks(BPIBIT):
+        if pattern and pattern.lower() not in name.lower():
+            continue
+        sys.setprofile(trace)
+        if setup:
+            setup()
+        function() # warm up lazy init and caches
+        sys.setprofile(None)
+        try:
+            results[name] = _measure(calls, function)
+        finally:
+            if teardown:
+                sys.setprofile(trace)
+                teardown()
+                sys.setprofile(None)
+    if uncovered is not None:
+        uncovered.extend(sorted(set(public.values()) - called))
+    return results
+
+def compare(results, baseline, tolerance):
+    """ Regressions of `results` against `baseline`, as printable lines. """
+    failures = []
+    for name, metrics in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        for key in _COUNTERS + ("sim_ms",):
+            if metrics[key] > old[key] + 1e-9:
+                failures.append("%s: %s %g -> %g" % (name, key, old[key], metrics[key]))
+        # CPython heap peaks jitter by a few blocks, asyncio's most of all
+        if metrics["alloc_bytes"] > old["alloc_bytes"] + max(_ALLOC_SLACK, old["alloc_bytes"] // 10):
+            failures.append("%s: alloc_bytes %d -> %d" % (name, old["alloc_bytes"], metrics["alloc_bytes"]))
+        if metrics["host_us"] > old["host_us"] * (1 + tolerance):
+            failures.append("%s: host_us %.1f -> %.1f" % (name, old["host_us"], metrics["host_us"]))
+    return failures
+
+def _print(results):
+    if not results:
+        print("no benchmark matches")
+        return
+    width = max(len(name) for name in results)
+    print("%-*s" % (width, "") + "".join("%10s" % title for _, title, _ in _COLUMNS))
+    for name, metrics in results.items():
+        print("%-*s" % (width, name) + "".join(
+            "%10s" % (fmt % metrics[key]) for key, _, fmt in _COLUMNS))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-k", dest="pattern", help="only benchmarks whose name contains this")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="compare against results saved with --json")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="allowed host time increase, 0.5 = +50%% (default)")
+    args = parser.parse_args(argv)
+
+    json_path = args.json and os.path.abspath(args.json)
+    baseline_path = args.baseline and os.path.abspath(args.baseline)
+    # calibration files land in a scratch directory, not the checkout
+    os.chdir(tempfile.mkdtemp(prefix="bpibit-bench-"))
+    uncovered = []
+    results = run(args.pattern, uncovered)
+    _print(results)
+    if not args.pattern and uncovered:
+        print("NOT COVERED " + " ".join(uncovered))
+
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+    if baseline_path:
+        with open(baseline_path) as f:
+            failures = compare(results, json.load(f), args.tolerance)
+        for line in failures:
+            print("REGRESSION " + line)
+        return 1 if failures else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
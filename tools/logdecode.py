@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# Host decoder for the segment files written by BPIBIT.startLogging()
+
+"""
+Reads the pages of one or more segment files (log0.bin, log1.bin, ...),
+puts them in sequence order and prints the records as CSV, or use
+`read_records()` from Python. Accel counts depend on the range the page was
+recorded at (gestures switch to +/-8 g), the accel_range_g column has it:
+
+    python3 tools/logdecode.py log*.bin > log.csv
+"""
+
+import argparse
+import csv
+import struct
+import sys
+
+MAGIC = b"BPL1"
+HEADER = struct.Struct("<4sIIHH")
+TICKS_MAX = 0x3FFFFFFF
+RANGE_SHIFT = 5 # accelerometer range bits of the channel mask
+
+# (mask bit, column names, struct format) in record order, see logger.py
+CHANNELS = (
+    (1, ("ax", "ay", "az"), "hhh"),
+    (2, ("gx", "gy", "gz"), "hhh"),
+    (4, ("mx", "my", "mz"), "hhh"),
+    (8, ("light_l", "light_r"), "HH"),
+    (16, ("temperature",), "H"),
+)
+
+def accel_range(channels):
+    """ Accelerometer full scale in g of a channel mask, 1 g is 32768 / full scale counts. """
+    return 2 << (channels >> RANGE_SHIFT & 3)
+
+def layout(channels):
+    """ Column names and struct.Struct of a record for a channel mask. """
+    names = ["ticks_ms"]
+    fmt = "<H"
+    for bit, columns, code in CHANNELS:
+        if channels & bit:
+            names.extend(columns)
+            fmt += code
+    return names, struct.Struct(fmt)
+
+def read_pages(paths, page_size=4096):
+    """ Valid pages of all files as (sequence, base ticks, channels, records bytes), in order. """
+    pages = []
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        for offset in range(0, len(data) - HEADER.size + 1, page_size):
+            magic, sequence, base, count, channels = HEADER.unpack_from(data, offset)
+            if magic != MAGIC:
+                continue
+            pages.append((sequence, base, count, channels, data[offset + HEADER.size:offset + page_size]))
+    pages.sort(key=lambda page: page[0])
+    return pages
+
+def read_records(paths, page_size=4096):
+    """
+    Yields (channels, record) with record a tuple of absolute ticks_ms and
+    the raw channel values, in recording order. A gap in the page sequence
+    numbers (eg. overwritten pages) restarts the time base at that page.
+    """
+    for sequence, base, count, channels, body in read_pages(paths, page_size):
+        _, record = layout(channels)
+        ticks = base
+        for i in range(count):
+            values = record.unpack_from(body, i * record.size)
+            ticks = (ticks + values[0]) & TICKS_MAX
+            yield channels, (ticks,) + values[1:]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("files", nargs="+", help="segment files written by the logger")
+    parser.add_argument("--page", type=int, default=4096, help="page size in bytes (default 4096)")
+    args = parser.parse_args(argv)
+
+    writer = csv.writer(sys.stdout)
+    header = None
+    for channels, record in read_records(args.files, args.page):
+        names, _ = layout(channels)
+        if channels & 1:
+            names.append("accel_range_g")
+            record += (accel_range(channels),)
+        if names != header:
+            writer.writerow(names)
+            header = names
+        writer.writerow(record)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
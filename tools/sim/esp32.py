@@ -0,0 +1,19 @@
+# Host simulator: esp32
+
+WAKEUP_ALL_LOW = False
+WAKEUP_ANY_HIGH = True
+
+touch_wakeup = False
+
+def raw_temperature():
+    return 120
+
+def wake_on_touch(wake):
+    global touch_wakeup
+    touch_wakeup = bool(wake)
+
+def wake_on_ext0(pin, level):
+    pass
+
+def wake_on_ext1(pins, level):
+    pass
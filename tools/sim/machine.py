@@ -0,0 +1,390 @@
+# Host simulator: machine, with a simulated MPU-9250 on the I2C bus
+
+"""
+Enough of the ESP32 `machine` module to import and run BPIBIT and the
+MPU-9250 drivers on a PC. Pin levels, ADC and touch readings are plain dicts
+the harness can set, I2C traffic goes to register level models of the
+MPU-6500 and AK8963, and timers run on the virtual clock in utime.
+"""
+
+import struct
+import micropython
+import utime
+
+class Pin:
+    IN = 1
+    OUT = 3
+    OPEN_DRAIN = 7
+    PULL_UP = 2
+    PULL_DOWN = 1
+    IRQ_RISING = 1
+    IRQ_FALLING = 2
+    WAKE_LOW = 4
+    WAKE_HIGH = 5
+
+    levels = {} # GPIO -> 0/1
+    pull_ups = (27, 35) # onboard buttons idle high
+    _handlers = {} # GPIO -> (handler, trigger)
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self.mode = mode
+        if value is not None:
+            Pin.levels[id] = 1 if value else 0
+
+    def init(self, mode=-1, pull=-1, value=None):
+        self.mode = mode
+        if value is not None:
+            Pin.levels[self.id] = 1 if value else 0
+
+    def value(self, value=None):
+        if value is None:
+            return Pin.levels.get(self.id, 1 if self.id in Pin.pull_ups else 0)
+        Pin.levels[self.id] = 1 if value else 0
+
+    __call__ = value
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def irq(self, handler=None, trigger=3, wake=None, hard=False):
+        if handler is None:
+            Pin._handlers.pop(self.id, None)
+        else:
+            Pin._handlers[self.id] = (handler, trigger)
+
+    @classmethod
+    def drive(cls, id, level):
+        """ Harness side: change an input level and fire its IRQ handler. """
+        pin = cls(id)
+        old = pin.value()
+        cls.levels[id] = 1 if level else 0
+        handler = cls._handlers.get(id)
+        if handler and old != cls.levels[id]:
+            edge = cls.IRQ_RISING if level else cls.IRQ_FALLING
+            if handler[1] & edge:
+                handler[0](pin)
+                micropython.run_scheduled()
+
+class ADC:
+    ATTN_0DB = 0
+    ATTN_2_5DB = 1
+    ATTN_6DB = 2
+    ATTN_11DB = 3
+    WIDTH_12BIT = 3
+
+    values = {} # GPIO -> 0..4095
+    reads = 0
+
+    def __init__(self, pin):
+        self.pin = pin
+
+    def atten(self, attenuation):
+        pass
+
+    def width(self, width):
+        pass
+
+    def read(self):
+        ADC.reads += 1
+        return ADC.values.get(self.pin.id, 2048)
+
+    def read_u16(self):
+        return self.read() << 4
+
+class PWM:
+    def __init__(self, pin, freq=5000, duty=512):
+        self.pin = pin
+        self._freq = freq
+        self._duty = duty
+
+    def init(self, freq=5000, duty=512):
+        self._freq = freq
+        self._duty = duty
+
+    def freq(self, freq=None):
+        if freq is None:
+            return self._freq
+        self._freq = freq
+
+    def duty(self, duty=None):
+        if duty is None:
+            return self._duty
+        self._duty = duty
+
+    def deinit(self):
+        pass
+
+class TouchPad:
+    values = {} # GPIO -> reading, lower is touched
+
+    def __init__(self, pin):
+        self.pin = pin
+
+    def read(self):
+        return TouchPad.values.get(self.pin.id, 600)
+
+    def config(self, value):
+        pass
+
+class SPI:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def write(self, buf):
+        pass
+
+    def readinto(self, buf, write=0):
+        pass
+
+class UART:
+    def __init__(self, id, baudrate=115200, **kwargs):
+        self.id = id
+        self.output = bytearray()
+        self.input = bytearray()
+
+    def init(self, baudrate=115200, **kwargs):
+        pass
+
+    def write(self, buf):
+        self.output.extend(buf)
+        return len(buf)
+
+    def any(self):
+        return len(self.input)
+
+    def readinto(self, buf, nbytes=None):
+        count = min(len(buf) if nbytes is None else nbytes, len(self.input))
+        buf[:count] = self.input[:count]
+        del self.input[:count]
+        return count or None
+
+    def read(self, nbytes=None):
+        count = len(self.input) if nbytes is None else min(nbytes, len(self.input))
+        data = bytes(self.input[:count])
+        del self.input[:count]
+        return data or None
+
+_timers = []
+_firing = False
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id):
+        self.id = id
+        self.callback = None
+
+    def init(self, mode=PERIODIC, period=1000, callback=None, freq=None):
+        if freq:
+            period = 1000 // freq
+        self.mode = mode
+        self.period = period
+        self.callback = callback
+        self.due = utime.now + period * 1000
+        if self not in _timers:
+            _timers.append(self)
+
+    def deinit(self):
+        if self in _timers:
+            _timers.remove(self)
+
+def _next_due():
+    return min((timer.due for timer in _timers), default=None)
+
+def _fire_timers():
+    # callbacks sleeping would advance the clock again, don't nest
+    global _firing
+    if _firing:
+        return
+    _firing = True
+    try:
+        fired = True
+        while fired:
+            fired = False
+            for timer in list(_timers):
+                if timer in _timers and timer.due <= utime.now:
+                    if timer.mode == Timer.ONE_SHOT:
+                        _timers.remove(timer)
+                    else:
+                        timer.due += timer.period * 1000
+                    timer.callback(timer)
+                    micropython.run_scheduled()
+                    fired = True
+    finally:
+        _firing = False
+
+class MPU6500Model:
+    """ Register map with burst reads, FIFO and INT_STATUS of the MPU-6500. """
+    FIFO_SIZE = 512
+
+    def __init__(self):
+        self.regs = bytearray(128)
+        self.regs[0x75] = 0x71 # WHO_AM_I
+        self.fifo = bytearray()
+        self.set(accel=(0, 0, 16384), gyro=(0, 0, 0), temperature=0)
+
+    def set(self, accel=None, gyro=None, temperature=None):
+        """ Raw register values, 16384 = 1 g and 131 = 1 dps at the defaults. """
+        if accel is not None:
+            struct.pack_into(">hhh", self.regs, 0x3B, *accel)
+        if temperature is not None:
+            struct.pack_into(">h", self.regs, 0x41, temperature)
+        if gyro is not None:
+            struct.pack_into(">hhh", self.regs, 0x43, *gyro)
+        self.regs[0x3A] |= 0x01 # RAW_DATA_RDY
+
+    def push_fifo(self, frames=1):
+        """ Queue `frames` copies of the current sample as enabled in FIFO_EN. """
+        enabled = self.regs[0x23]
+        for _ in range(frames):
+            if enabled & 0x08:
+                self.fifo += self.regs[0x3B:0x41]
+            if enabled & 0x80:
+                self.fifo += self.regs[0x41:0x43]
+            if enabled & 0x40:
+                self.fifo += self.regs[0x43:0x45]
+            if enabled & 0x20:
+                self.fifo += self.regs[0x45:0x47]
+            if enabled & 0x10:
+                self.fifo += self.regs[0x47:0x49]
+        if len(self.fifo) > self.FIFO_SIZE:
+            if self.regs[0x1A] & 0x40: # CONFIG.FIFO_MODE: stop when full
+                del self.fifo[self.FIFO_SIZE:]
+            else: # replace the oldest data
+                del self.fifo[:len(self.fifo) - self.FIFO_SIZE]
+            self.regs[0x3A] |= 0x10 # FIFO_OFLOW
+
+    def read(self, reg, buf):
+        for i in range(len(buf)):
+            if reg == 0x74: # FIFO_R_W does not auto increment
+                buf[i] = self.fifo.pop(0) if self.fifo else 0
+                continue
+            address = reg + i
+            if address == 0x72:
+                buf[i] = len(self.fifo) >> 8
+            elif address == 0x73:
+                buf[i] = len(self.fifo) & 0xFF
+            else:
+                buf[i] = self.regs[address]
+                if address == 0x3A: # INT_STATUS clears on read
+                    self.regs[0x3A] = 0
+
+    def write(self, reg, buf):
+        self.regs[reg:reg + len(buf)] = buf
+        if reg == 0x6A and buf[0] & 0x04: # FIFO_RST
+            self.fifo = bytearray()
+            self.regs[0x6A] &= ~0x04
+
+class AK8963Model:
+    """ Register map of the AK8963, always reporting fresh data. """
+    def __init__(self):
+        self.regs = bytearray(32)
+        self.regs[0x00] = 0x48 # WIA
+        self.regs[0x02] = 0x01 # ST1 DRDY
+        self.regs[0x10:0x13] = bytes((176, 177, 165)) # ASA
+        self.set((100, 0, -50))
+
+    def set(self, xyz):
+        """ Raw register values, about 0.15 uT each at 16 bit. """
+        struct.pack_into("<hhh", self.regs, 0x03, *xyz)
+
+    def read(self, reg, buf):
+        buf[:] = self.regs[reg:reg + len(buf)]
+
+    def write(self, reg, buf):
+        self.regs[reg:reg + len(buf)] = buf
+
+mpu6500 = MPU6500Model()
+ak8963 = AK8963Model()
+
+class SoftI2C:
+    devices = {0x68: mpu6500, 0x0C: ak8963}
+    transactions = 0 # totals over all buses since the last reset
+    bytes = 0
+
+    def __init__(self, scl=None, sda=None, freq=400000, timeout=50000):
+        pass
+
+    def scan(self):
+        return sorted(SoftI2C.devices)
+
+    def _device(self, addr):
+        SoftI2C.transactions += 1
+        try:
+            return SoftI2C.devices[addr]
+        except KeyError:
+            raise OSError(19) # ENODEV, what a NACK looks like
+
+    def readfrom_mem_into(self, addr, memaddr, buf, addrsize=8):
+        self._device(addr).read(memaddr, buf)
+        SoftI2C.bytes += len(buf) + 1
+
+    def readfrom_mem(self, addr, memaddr, nbytes, addrsize=8):
+        buf = bytearray(nbytes)
+        self.readfrom_mem_into(addr, memaddr, buf)
+        return bytes(buf)
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        self._device(addr).write(memaddr, buf)
+        SoftI2C.bytes += len(buf) + 1
+
+I2C = SoftI2C
+
+class _Mem32:
+    # GPIO_OUT/IN register window backed by Pin.levels
+    def __getitem__(self, addr):
+        base = 0 if addr == 0x3FF4403C else 32
+        value = 0
+        for gpio in range(32):
+            if Pin(base + gpio).value():
+                value |= 1 << gpio
+        return value
+
+    def __setitem__(self, addr, value):
+        base = 0 if addr in (0x3FF44008, 0x3FF4400C) else 32
+        level = 1 if addr in (0x3FF44008, 0x3FF44014) else 0
+        for gpio in range(32):
+            if value >> gpio & 1:
+                Pin.levels[base + gpio] = level
+
+mem32 = _Mem32()
+
+DEEPSLEEP_RESET = 4
+PWRON_RESET = 1
+
+def disable_irq():
+    return 0
+
+def enable_irq(state):
+    pass
+
+def freq(hz=None):
+    return 240000000
+
+def unique_id():
+    return b"\x01\x02\x03\x04\x05\x06"
+
+def reset_cause():
+    return PWRON_RESET
+
+def reset():
+    raise SystemExit("machine.reset()")
+
+def deepsleep(ms=0):
+    raise SystemExit("machine.deepsleep(%d)" % ms)
+
+def lightsleep(ms=0):
+    utime.sleep_ms(ms)
+
+def reset_counters():
+    """ Zero the I2C, ADC and NeoPixel counters. """
+    import neopixel
+    SoftI2C.transactions = 0
+    SoftI2C.bytes = 0
+    ADC.reads = 0
+    neopixel.NeoPixel.writes = 0
@@ -0,0 +1,42 @@
+# Host simulator: micropython
+
+"""
+`const` and the code emitters are no-ops. `schedule()` queues like the
+firmware does (depth 8) and the queue runs from `run_scheduled()`, which
+machine.Timer calls after every callback.
+"""
+
+_SCHEDULE_DEPTH = 8
+_queue = []
+
+def const(value):
+    return value
+
+def native(function):
+    return function
+
+def viper(function):
+    return function
+
+def schedule(function, arg):
+    if len(_queue) >= _SCHEDULE_DEPTH:
+        raise RuntimeError("schedule queue full")
+    _queue.append((function, arg))
+
+def run_scheduled():
+    while _queue:
+        function, arg = _queue.pop(0)
+        function(arg)
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+def mem_info(verbose=False):
+    pass
+
+# MicroPython heap queries missing from CPython's gc
+import gc as _gc
+if not hasattr(_gc, "mem_alloc"):
+    _gc.mem_alloc = lambda: 0
+    _gc.mem_free = lambda: 1 << 20
+    _gc.threshold = lambda amount=None: -1
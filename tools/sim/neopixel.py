@@ -0,0 +1,31 @@
+# Host simulator: neopixel
+
+class NeoPixel:
+    """ Same buffer layout as the firmware (GRB), writes are only counted. """
+    ORDER = (1, 0, 2, 3)
+    writes = 0 # strip refreshes since the last reset, all instances
+
+    def __init__(self, pin, n, bpp=3, timing=1):
+        self.pin = pin
+        self.n = n
+        self.bpp = bpp
+        self.buf = bytearray(n * bpp)
+
+    def __len__(self):
+        return self.n
+
+    def __setitem__(self, index, value):
+        offset = index * self.bpp
+        for i in range(self.bpp):
+            self.buf[offset + self.ORDER[i]] = value[i]
+
+    def __getitem__(self, index):
+        offset = index * self.bpp
+        return tuple(self.buf[offset + self.ORDER[i]] for i in range(self.bpp))
+
+    def fill(self, value):
+        for i in range(self.n):
+            self[i] = value
+
+    def write(self):
+        NeoPixel.writes += 1
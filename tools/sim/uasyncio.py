@@ -0,0 +1,23 @@
+# Host simulator: uasyncio on top of asyncio and the virtual clock
+
+from asyncio import * # noqa: F401,F403
+import asyncio as _asyncio
+
+async def sleep_ms(ms):
+    import utime
+    utime.sleep_ms(ms)
+    await _asyncio.sleep(0)
+
+async def sleep(seconds):
+    await sleep_ms(int(seconds * 1000))
+
+class ThreadSafeFlag:
+    def __init__(self):
+        self._event = Event()
+
+    def set(self):
+        self._event.set()
+
+    async def wait(self):
+        await self._event.wait()
+        self._event.clear()
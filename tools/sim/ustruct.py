@@ -0,0 +1,2 @@
+# Host simulator: ustruct
+from struct import * # noqa: F401,F403
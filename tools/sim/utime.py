@@ -0,0 +1,66 @@
+# Host simulator: utime on a virtual microsecond clock
+
+"""
+Time only moves when the code under test sleeps or the harness calls
+`advance()`, so runs are deterministic and a 10 second scroll finishes in
+milliseconds of real time. The clock stops at every machine.Timer due time
+on the way and fires it, so a long sleep runs a periodic timer once per
+period.
+"""
+
+import time as _time
+
+_TICKS_MAX = 0x3FFFFFFF
+_TICKS_HALF = 0x20000000
+
+now = 0 # virtual time in microseconds since import
+
+def ticks_us():
+    return now & _TICKS_MAX
+
+def ticks_ms():
+    return (now // 1000) & _TICKS_MAX
+
+def ticks_cpu():
+    return ticks_us()
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & _TICKS_MAX
+
+def ticks_diff(end, start):
+    diff = (end - start) & _TICKS_MAX
+    return diff - _TICKS_MAX - 1 if diff & _TICKS_HALF else diff
+
+def sleep(seconds):
+    advance(int(seconds * 1000000))
+
+def sleep_ms(ms):
+    advance(ms * 1000)
+
+def sleep_us(us):
+    advance(us)
+
+def time():
+    return now // 1000000
+
+def localtime(secs=None):
+    return _time.gmtime(time() if secs is None else secs)[:8]
+
+def advance(us):
+    """
+    Move the virtual clock forward, stopping at every timer due time on the
+    way to run it, so timers re-armed from their callback keep firing.
+    """
+    global now
+    end = now + int(us)
+    import machine
+    if machine._firing: # a callback sleeping, its timers wait for the outer loop
+        now = end
+        return
+    while True:
+        due = machine._next_due()
+        if due is None or due > end:
+            break
+        now = max(now, due)
+        machine._fire_timers()
+    now = end
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# Loopback test of BPIBIT telemetry through a pseudo terminal
+
+"""
+Runs BPIBIT.startTelemetry() on the simulator in tools/sim with its UART
+writing into one end of a pty, decodes the other end with
+tools/telemetrydecode.py and checks that every frame arrives in order with
+the values the simulated sensors had. Then it corrupts one frame and drops
+another to check that both are detected. Exits with 1 on failure.
+
+    python3 tools/telemetry_loopback.py
+"""
+
+import os
+import sys
+import tempfile
+import tty
+
+_TOOLS = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(_TOOLS, "sim"), os.path.dirname(_TOOLS), _TOOLS]
+
+import machine # noqa: E402
+import utime # noqa: E402
+from telemetrydecode import FrameDecoder # noqa: E402
+
+class _PtyWriter:
+    # what a machine.UART looks like to telemetry.py, writing into the pty
+    def __init__(self, fd):
+        self.fd = fd
+        self.mangle = None # called with each frame, may return a new one
+
+    def write(self, buf):
+        data = bytes(buf)
+        if self.mangle:
+            data = self.mangle(data)
+        os.write(self.fd, data)
+        return len(buf)
+
+def _read(fd, decoder):
+    frames = []
+    os.set_blocking(fd, False)
+    while True:
+        try:
+            data = os.read(fd, 4096)
+        except (BlockingIOError, OSError):
+            break
+        if not data:
+            break
+        frames.extend(decoder.feed(data))
+    return frames
+
+def main():
+    os.chdir(tempfile.mkdtemp(prefix="bpibit-telemetry-"))
+    import BPIBIT
+
+    master, slave = os.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+    writer = _PtyWriter(slave)
+    decoder = FrameDecoder()
+    failures = []
+
+    machine.ADC.values.update({36: 1000, 39: 2000, 34: 3000})
+    channels = ('accel', 'gyro', 'magnetic', 'light', 'temperature')
+    if not BPIBIT.startTelemetry(channels, rate=100, uart=writer):
+        print("FAIL startTelemetry")
+        return 1
+
+    expected = []
+    frames = []
+    for i in range(200):
+        accel = (i, -i, 16384 - i)
+        gyro = (3 * i, -3 * i, 7)
+        machine.mpu6500.set(accel=accel, gyro=gyro)
+        machine.ak8963.set((i, 2 * i, -i))
+        utime.sleep_ms(10)
+        expected.append(accel + gyro + (i, 2 * i, -i, 1000, 2000, 3000))
+        frames.extend(_read(master, decoder))
+
+    if len(frames) != 200:
+        failures.append("got %d frames, expected 200" % len(frames))
+    for frame, values in zip(frames, expected):
+        if frame.values != values:
+            failures.append("frame %d: %r != %r" % (frame.sequence, frame.values, values))
+            break
+    if [frame.sequence for frame in frames] != list(range(len(frames))):
+        failures.append("sequence numbers out of order")
+    if decoder.lost or decoder.crc_errors or decoder.skipped:
+        failures.append("clean link reported errors")
+
+    # one corrupted frame and one dropped frame, plus REPL text in between
+    sent = [0]
+    def mangle(data):
+        sent[0] += 1
+        if sent[0] == 3:
+            data = data[:12] + bytes((data[12] ^ 0xFF,)) + data[13:]
+        elif sent[0] == 6:
+            return b""
+        elif sent[0] == 8:
+            data = b">>> print('hi')\r\nhi\r\n" + data
+        return data
+    writer.mangle = mangle
+    for _ in range(10):
+        utime.sleep_ms(10)
+        _read(master, decoder)
+    if decoder.crc_errors < 1 or decoder.lost != 2 or decoder.frames != 208:
+        failures.append("damage not detected: frames %d, lost %d, crc errors %d" % (
+            decoder.frames, decoder.lost, decoder.crc_errors))
+
+    BPIBIT.stopTelemetry()
+    os.close(master)
+    os.close(slave)
+    for line in failures:
+        print("FAIL " + line)
+    if not failures:
+        print("PASS %d frames, lost %d, crc errors %d, skipped bytes %d" % (
+            decoder.frames, decoder.lost, decoder.crc_errors, decoder.skipped))
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
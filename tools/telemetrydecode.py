@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# Host decoder for the frames sent by BPIBIT.startTelemetry()
+
+"""
+Decodes the binary telemetry frames of telemetry.py from a serial port,
+file or pipe and prints them as CSV. Use `FrameDecoder` from Python:
+
+    decoder = FrameDecoder()
+    for frame in decoder.feed(data):
+        print(frame.sequence, frame.ticks, frame.values)
+
+Bytes that are not part of a valid frame (REPL output, line noise) are
+skipped, CRC failures and sequence gaps are counted. Accel counts depend
+on the range the frame was sent at (gestures switch to +/-8 g), the
+accel_range_g column has it.
+
+    python3 tools/telemetrydecode.py /dev/ttyUSB0 --baud 115200 > data.csv
+"""
+
+import argparse
+import collections
+import csv
+import os
+import struct
+import sys
+
+SYNC = b"\xA5\x5A"
+TICKS_MAX = 0x3FFFFFFF
+RANGE_SHIFT = 5 # accelerometer range bits of the channel mask
+
+# (mask bit, column names, struct format) in payload order, see telemetry.py
+CHANNELS = (
+    (1, ("ax", "ay", "az"), "hhh"),
+    (2, ("gx", "gy", "gz"), "hhh"),
+    (4, ("mx", "my", "mz"), "hhh"),
+    (8, ("light_l", "light_r"), "HH"),
+    (16, ("temperature",), "H"),
+)
+
+_MIN_LENGTH = 7 # channels, sequence and ticks
+_MAX_LENGTH = 7 + 24 # all channels
+
+Frame = collections.namedtuple("Frame", "sequence ticks channels values")
+
+def crc16(data):
+    """ CRC-16/CCITT-FALSE. """
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte << 8
+        for _ in range(8):
+            crc = (crc << 1 ^ 0x1021 if crc & 0x8000 else crc << 1) & 0xFFFF
+    return crc
+
+def accel_range(channels):
+    """ Accelerometer full scale in g of a channel mask, 1 g is 32768 / full scale counts. """
+    return 2 << (channels >> RANGE_SHIFT & 3)
+
+def columns(channels):
+    names = []
+    for bit, names_, _ in CHANNELS:
+        if channels & bit:
+            names.extend(names_)
+    return names
+
+def _payload(channels):
+    return struct.Struct("<" + "".join(code for bit, _, code in CHANNELS if channels & bit))
+
+class FrameDecoder:
+    """
+    Feed it bytes in any chunking, get whole frames back. `frames`,
+    `crc_errors`, `lost` (frames missing by sequence number) and `skipped`
+    (bytes outside of frames) add up over the whole stream.
+    """
+    def __init__(self):
+        self._buffer = bytearray()
+        self._layouts = {}
+        self._sequence = None
+        self.frames = 0
+        self.crc_errors = 0
+        self.lost = 0
+        self.skipped = 0
+
+    def feed(self, data):
+        buffer = self._buffer
+        buffer.extend(data)
+        frames = []
+        while True:
+            start = buffer.find(SYNC)
+            if start < 0:
+                keep = 1 if buffer[-1:] == SYNC[:1] else 0
+                self.skipped += len(buffer) - keep
+                del buffer[:len(buffer) - keep]
+                break
+            if start:
+                self.skipped += start
+                del buffer[:start]
+            if len(buffer) < 3:
+                break
+            end = 3 + buffer[2]
+            if not _MIN_LENGTH <= buffer[2] <= _MAX_LENGTH:
+                self.skipped += 1
+                del buffer[:1]
+                continue
+            if len(buffer) < end + 2:
+                break
+            if crc16(buffer[2:end]) != struct.unpack_from("<H", buffer, end)[0]:
+                # not a frame after all, resync after this sync word
+                self.crc_errors += 1
+                self.skipped += 1
+                del buffer[:1]
+                continue
+            channels = buffer[3]
+            sequence, ticks = struct.unpack_from("<HI", buffer, 4)
+            layout = self._layouts.get(channels)
+            if layout is None:
+                layout = self._layouts[channels] = _payload(channels)
+            if layout.size != end - 10:
+                self.crc_errors += 1
+                del buffer[:1]
+                continue
+            values = layout.unpack_from(buffer, 10)
+            del buffer[:end + 2]
+            if self._sequence is not None:
+                self.lost += (sequence - self._sequence - 1) & 0xFFFF
+            self._sequence = sequence
+            self.frames += 1
+            frames.append(Frame(sequence, ticks, channels, values))
+        return frames
+
+def _open(path, baud):
+    # pyserial when installed, else a raw tty or any readable file
+    if path == "-":
+        return sys.stdin.buffer
+    try:
+        import serial
+        return serial.Serial(path, baud, timeout=0.1)
+    except ImportError:
+        pass
+    stream = open(path, "rb", buffering=0)
+    if os.isatty(stream.fileno()):
+        import termios
+        import tty
+        tty.setraw(stream.fileno())
+        attributes = termios.tcgetattr(stream.fileno())
+        speed = getattr(termios, "B%d" % baud)
+        attributes[4] = attributes[5] = speed
+        termios.tcsetattr(stream.fileno(), termios.TCSANOW, attributes)
+    return stream
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("port", help="serial port, file, or - for stdin")
+    parser.add_argument("--baud", type=int, default=115200)
+    parser.add_argument("--count", type=int, default=0, help="stop after this many frames")
+    args = parser.parse_args(argv)
+
+    stream = _open(args.port, args.baud)
+    decoder = FrameDecoder()
+    writer = csv.writer(sys.stdout)
+    header = None
+    try:
+        while not args.count or decoder.frames < args.count:
+            data = stream.read(4096)
+            if not data:
+                if data is not None and not getattr(stream, "timeout", None):
+                    break # end of file
+                continue
+            for frame in decoder.feed(data):
+                names = ["sequence", "ticks_us"] + columns(frame.channels)
+                row = (frame.sequence, frame.ticks) + frame.values
+                if frame.channels & 1:
+                    names.append("accel_range_g")
+                    row += (accel_range(frame.channels),)
+                if names != header:
+                    writer.writerow(names)
+                    header = names
+                writer.writerow(row)
+    except KeyboardInterrupt:
+        pass
+    print("frames %d, lost %d, crc errors %d, skipped bytes %d" % (
+        decoder.frames, decoder.lost, decoder.crc_errors, decoder.skipped), file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+# MicroPython ESP32 adaptive capacitive touch scanning for BPI:bit/Web:bit
+
+"""
+Scans a set of touch pads and decides touched/released against a baseline
+and noise level learnt per pad, so no fixed threshold has to be tuned per
+board. State changes are queued as events with ticks_ms time stamps and are
+also kept as a bitmask.
+"""
+
+# pylint: disable=import-error
+import utime
+from array import array
+from micropython import const
+# pylint: enable=import-error
+
+_FRACTION = const(4) # baseline and noise are kept in 1/16 counts
+_BASELINE_SHIFT = const(7) # baseline follows 1/128 of the difference per scan
+_NOISE_SHIFT = const(4)
+
+class TouchScanner:
+    """
+    `pads` is a sequence of (pin number, machine.TouchPad). A pad is
+    touched when its reading drops below the baseline by more than
+    `sensitivity` of the baseline (1/8 by default) or `margin` times the
+    noise, whichever is larger, for `debounce` scans in a row; it is
+    released once the drop is less than half of that. The first `settle`
+    scans only learn. Up to `size` - 1 unread events are queued.
+    """
+    def __init__(self, pads, sensitivity=8, margin=4, debounce=2, settle=16, size=16):
+        count = len(pads)
+        self._pins = bytes(pin for pin, _ in pads)
+        self._pads = tuple(pad for _, pad in pads)
+        self._sensitivity = sensitivity
+        self._margin = margin
+        self._debounce = debounce
+        self._settle = settle
+        self.baseline = array("l", (0 for _ in range(count)))
+        self.noise = array("l", (0 for _ in range(count)))
+        self._streak = bytearray(count)
+        self.touched = 0 # bit n set while pin n is touched
+        self.scans = 0
+
+        self._codes = bytearray(size)
+        self._times = array("L", (0 for _ in range(size)))
+        self._head = 0
+        self._tail = 0
+        self.dropped = 0
+
+    def scan(self):
+        """ Read every pad once and update baselines, state and events. """
+        now = utime.ticks_ms()
+        for i in range(len(self._pads)):
+            reading = self._pads[i].read() << _FRACTION
+            if not self.scans:
+                self.baseline[i] = reading
+                self.noise[i] = reading >> 6
+                continue
+            baseline = self.baseline[i]
+            drop = baseline - reading
+            threshold = self.threshold(i)
+            bit = 1 << self._pins[i]
+            touched = self.touched & bit
+
+            if self.scans < self._settle:
+                changed = False
+            elif touched:
+                changed = drop < threshold >> 1
+            else:
+                changed = drop > threshold
+            if changed:
+                self._streak[i] += 1
+                if self._streak[i] >= self._debounce:
+                    self._streak[i] = 0
+                    self.touched ^= bit
+                    self._push(self._pins[i] << 1 | (0 if touched else 1), now)
+                    touched = not touched
+            else:
+                self._streak[i] = 0
+
+            # learn only while untouched, follow rising readings faster
+            if not touched:
+                if drop < 0:
+                    self.baseline[i] = baseline - (drop >> 3)
+                else:
+                    self.baseline[i] = baseline - (drop >> _BASELINE_SHIFT)
+                self.noise[i] += (abs(drop) - self.noise[i]) >> _NOISE_SHIFT
+        self.scans += 1
+
+    def threshold(self, i):
+        """ Drop below the baseline of pad `i` that counts as a touch, in 1/16. """
+        return max(self.baseline[i] // self._sensitivity, self.noise[i] * self._margin)
+
+    def wake_level(self, i):
+        """ Raw reading of pad `i` below which it should wake the chip. """
+        return (self.baseline[i] - self.threshold(i)) >> _FRACTION
+
+    def _push(self, code, now):
+        tail = self._tail
+        following = (tail + 1) % len(self._codes)
+        if following == self._head:
+            self.dropped += 1
+            return
+        self._codes[tail] = code
+        self._times[tail] = now
+        self._tail = following
+
+    def get(self):
+        """ The oldest unread event as (pin, touched, ticks_ms), or None. """
+        head = self._head
+        if head == self._tail:
+            return None
+        code = self._codes[head]
+        event = (code >> 1, bool(code & 1), self._times[head])
+        self._head = (head + 1) % len(self._codes)
+        return event